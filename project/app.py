@@ -1,22 +1,115 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session, g
+import os
+import sys
+import time
 import uuid
-from game_logic import Game
+import json
+import metrics
+from game_logic import AVATARS, GESTURE_MOVES, Game, load_classifier, preload_vision
+from gesture_stream import GestureStream
+from hand_pool import get_pool, get_tracking_pool
+from pacing import Pacer
+from session_store import create_store
+
+# Optional: WebSocket streaming of gesture frames (pip install flask-sock)
+try:
+    from flask_sock import Sock
+except Exception as e:
+    print(f"Warning: flask-sock not installed, gesture streaming disabled. Error: {e}")
+    Sock = None
 
 app = Flask(__name__)
 app.secret_key = "super_secret_snake_key_replace_in_prod"
+sock = Sock(app) if Sock else None
+
+# PRELOAD_VISION=1 imports OpenCV/MediaPipe now instead of on the first
+# gesture frame; with `gunicorn --preload` (see gunicorn.conf.py) that happens
+# once in the master and forked workers share the pages copy-on-write.
+if os.environ.get("PRELOAD_VISION") == "1":
+    preload_vision()
+
+# Upper bound on /api/play/batch, so one request cannot hold a worker for long
+MAX_BATCH_ROUNDS = int(os.environ.get("MAX_BATCH_ROUNDS", "10000"))
+# Upper bound on hands per /api/gesture/landmarks/batch call
+MAX_BATCH_HANDS = int(os.environ.get("MAX_BATCH_HANDS", "4096"))
+# Generous size of one number in a JSON landmark body, to bound it before parsing
+LANDMARK_JSON_BYTES = 32
 
-# Store game instances. 
-# Session ID -> Game()
-games = {}
+# Session ID -> Game(), in memory or shared between workers (see session_store.py)
+games = create_store()
 
 def get_game(create=False):
     if 'session_id' not in session:
         session['session_id'] = str(uuid.uuid4())
     
     sid = session['session_id']
-    if sid not in games or create:
-        games[sid] = Game()
-    return games[sid]
+    # Every route looks up its session, so this is not a gesture stage
+    with metrics.timer("session_lookup_seconds"):
+        game = None if create else games.get(sid)
+    if game is None:
+        game = Game()
+        games.save(sid, game)
+    game.session_id = sid
+    return game
+
+def save_game(game):
+    """Writes the session's game back after a route changed it."""
+    games.save(session['session_id'], game)
+
+def save_gesture(game):
+    """Writes back only the debounce state, after a gesture route."""
+    games.save_gesture(session['session_id'], game)
+
+# --- Metrics (enabled with METRICS=1) ---
+metrics.register_gauge("sessions_live", lambda: len(games), "Sessions held by the session store")
+metrics.register_gauge("hands_pool_size", lambda: get_pool().size, "Detectors the shared pool may build")
+metrics.register_gauge("hands_pool_created", lambda: get_pool().created, "Detectors built so far")
+metrics.register_gauge("hands_pool_in_use", lambda: get_pool().in_use, "Detectors checked out right now")
+metrics.register_gauge("gesture_streams_open", lambda: get_tracking_pool().in_use, "Open gesture streams")
+def queue_stat(name):
+    # Never import the vision stack just to scrape it
+    inference = sys.modules.get("inference")
+    stats = inference.queue_stats() if inference else None
+    return stats[name] if stats else None
+
+def queue_load():
+    """How full the inference queue is (0..1), for pacing; None without a queue."""
+    inference = sys.modules.get("inference")
+    stats = inference.queue_stats() if inference else None
+    return stats["depth"] / stats["capacity"] if stats else None
+
+def inference_capacity():
+    """Frames that can be detected at once: queue workers if frames go there, else pooled detectors."""
+    workers = queue_stat("workers")
+    return workers if workers else get_pool().size
+
+# Advises polling clients how often and how big to send frames (see pacing.py)
+pacer = Pacer(inference_capacity, queue_load)
+metrics.register_gauge("gesture_pacing_interval_ms", lambda: pacer.advice()["next_ms"],
+                       "Frame interval currently advised to polling clients")
+
+metrics.register_gauge("inference_queue_depth", lambda: queue_stat("depth"),
+                       "Frames waiting for an inference worker")
+metrics.register_gauge("gesture_frames_dropped_total", lambda: queue_stat("dropped"),
+                       "Stale frames dropped by the inference queue")
+metrics.register_gauge("inference_worker_restarts_total", lambda: queue_stat("restarts"),
+                       "Times the inference worker pool was rebuilt after a worker died")
+
+if metrics.ENABLED:
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        if request.url_rule is not None and 'request_start' in g:
+            metrics.observe("http_request_seconds", time.perf_counter() - g.request_start,
+                            "route", request.url_rule.rule)
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def index():
@@ -32,14 +125,15 @@ def configure_game():
     game.input_mode = data.get('input_mode', '1') # 1=Keyboard, 2=Gesture
     game.avatar = data.get('avatar', 'rusty')
     game.reset_stats()
+    save_game(game)
     
     return jsonify({
         "status": "ok", 
         "message": "Game configured", 
         "difficulty": game.difficulty,
         "avatar": game.avatar,
-        "avatar_name": game.avatars[game.avatar]["name"],
-        "catchphrase": game.avatars[game.avatar]["catchphrase"]
+        "avatar_name": AVATARS[game.avatar]["name"],
+        "catchphrase": AVATARS[game.avatar]["catchphrase"]
     })
 
 
@@ -53,6 +147,25 @@ def play_round():
         return jsonify({"error": "No move provided"}), 400
         
     result = game.play_round(user_move)
+    save_game(game)
+    return jsonify(result)
+
+@app.route('/api/play/batch', methods=['POST'])
+def play_rounds():
+    game = get_game()
+    data = request.json or {}
+    moves = data.get('moves')
+
+    if not moves or not isinstance(moves, list):
+        return jsonify({"error": "No moves provided"}), 400
+    if len(moves) > MAX_BATCH_ROUNDS:
+        return jsonify({"error": f"At most {MAX_BATCH_ROUNDS} moves per batch"}), 400
+    unknown = sorted({str(move) for move in moves if move not in GESTURE_MOVES})
+    if unknown:
+        return jsonify({"error": f"Unknown moves: {', '.join(unknown)}"}), 400
+
+    result = game.play_rounds(moves)
+    save_game(game)
     return jsonify(result)
 
 @app.route('/api/gesture', methods=['POST'])
@@ -64,9 +177,133 @@ def detect_gesture():
     if not image_data:
         return jsonify({"error": "No image provided"}), 400
         
-    detected = game.process_gesture_frame(image_data)
-    # Return detected gesture or null
-    return jsonify({"gesture": detected})
+    with pacer.track():
+        detected = game.process_gesture_frame(image_data)
+    # Raw gesture (or null) plus the debounced state for this session
+    result = game.debounce_gesture(detected)
+    save_gesture(game)
+    result["pacing"] = pacer.advice()
+    return jsonify(result)
+
+@app.route('/api/gesture/frame', methods=['POST'])
+def detect_gesture_frame():
+    """
+    Binary variant of /api/gesture: the body is the encoded frame itself
+    (image/jpeg, image/webp or application/octet-stream), or a multipart
+    form with the frame in a "frame" field. Skips the base64 round trip.
+    """
+    game = get_game()
+    if request.files:
+        upload = request.files.get('frame') or next(iter(request.files.values()))
+        image_bytes = upload.read()
+    else:
+        image_bytes = request.get_data(cache=False)
+
+    if not image_bytes:
+        return jsonify({"error": "No image provided"}), 400
+
+    with pacer.track():
+        detected = game.process_gesture_bytes(image_bytes)
+    result = game.debounce_gesture(detected)
+    save_gesture(game)
+    result["pacing"] = pacer.advice()
+    return jsonify(result)
+
+def read_landmarks(max_hands=None):
+    """
+    Landmarks from the request as a (N, 21, 3) array: either a packed binary
+    body (application/octet-stream, dtype=float16|float32 in the query
+    string, float32 by default) or JSON {"landmarks": [[x, y, z], ...]}
+    with one hand or a list of hands. Bodies too big for `max_hands` are
+    rejected before they are read. Raises ValueError on bad input and
+    RuntimeError when the classifier is unavailable.
+    """
+    classifier = load_classifier()
+    if classifier is None:
+        raise RuntimeError("Gesture classifier unavailable")
+    dtype = request.args.get('dtype', 'float32')
+    if max_hands is not None:
+        packed = classifier.LANDMARK_DTYPES.get(dtype)
+        value_bytes = LANDMARK_JSON_BYTES if request.is_json or packed is None else packed.itemsize
+        if (request.content_length or 0) > max_hands * classifier.LANDMARK_VALUES * value_bytes:
+            raise ValueError(f"At most {max_hands} hands per batch")
+    if request.is_json:
+        body = request.get_json(silent=True)
+        data = body.get('landmarks') if isinstance(body, dict) else None
+        if not data:
+            raise ValueError("No landmarks provided")
+    else:
+        data = request.get_data(cache=False)
+    return classifier.unpack_landmarks(data, dtype)
+
+@app.route('/api/gesture/landmarks', methods=['POST'])
+def detect_gesture_landmarks():
+    """
+    One hand's 21 landmarks computed on the client (e.g. MediaPipe in the
+    browser), classified with the same rules as frames and debounced like
+    /api/gesture. Same response, without sending or decoding an image.
+    """
+    game = get_game()
+    try:
+        points = read_landmarks()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    if len(points) != 1:
+        return jsonify({"error": "Send one hand here, or use /api/gesture/landmarks/batch"}), 400
+
+    # No pacing: classifying landmarks costs next to nothing next to a frame
+    detected = game.process_gesture_landmarks(points[0])
+    result = game.debounce_gesture(detected)
+    save_gesture(game)
+    return jsonify(result)
+
+@app.route('/api/gesture/landmarks/batch', methods=['POST'])
+def classify_landmarks_batch():
+    """
+    Classifies many hands in one call, in the same formats as
+    /api/gesture/landmarks. Stateless: no session or debouncing.
+    """
+    try:
+        points = read_landmarks(MAX_BATCH_HANDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    # Bodies sent without a Content-Length are only checked once parsed
+    if len(points) > MAX_BATCH_HANDS:
+        return jsonify({"error": f"At most {MAX_BATCH_HANDS} hands per batch"}), 400
+
+    metrics.inc("gesture_landmarks_total", len(points))
+    with metrics.stage("classify"):
+        gestures = load_classifier().classify_batch(points).tolist()
+    return jsonify({"gestures": gestures})
+
+if sock:
+    @sock.route('/ws/gesture')
+    def gesture_stream(ws):
+        """
+        Persistent gesture channel. The client sends encoded frames as binary
+        messages and "reset" as text once it has played a locked gesture.
+        The server only replies when the debounced gesture changes.
+        """
+        game = get_game()
+        with GestureStream(game) as stream:
+            if stream.hands is None:
+                ws.send(json.dumps({"error": "No gesture detector available"}))
+                return
+            while True:
+                message = ws.receive()
+                if message is None:
+                    break
+                if isinstance(message, str):
+                    if message == "reset":
+                        stream.reset()
+                    continue
+                event = stream.feed(message)
+                if event:
+                    ws.send(json.dumps(event))
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
@@ -0,0 +1,201 @@
+"""
+ASGI entry point: uvicorn asgi:app  (or gunicorn -k uvicorn.workers.UvicornWorker asgi:app)
+
+Gesture traffic is handled natively on the event loop: the body is read
+without holding a thread and only the CPU-bound part (decode + inference)
+runs on a dedicated executor, while every other route goes to the Flask app
+through asgiref on a second thread pool (ASGI_WSGI_THREADS, like gunicorn's
+--threads in the Procfile). /api/play and /api/stats therefore never queue
+behind inference or behind each other, and idle keep-alive connections cost
+a socket rather than a worker thread.
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import app as flask_app, games, pacer
+from gesture_stream import GestureStream
+from hand_pool import DEFAULT_POOL_SIZE, DEFAULT_TRACKING_POOL_SIZE
+
+# One thread per detector that can be busy at once; more would only wait on the pools
+INFERENCE_THREADS = int(os.environ.get("ASGI_INFERENCE_THREADS",
+                                       str(DEFAULT_POOL_SIZE + DEFAULT_TRACKING_POOL_SIZE)))
+# Frames allowed to wait for the executor before new ones get a 503
+MAX_PENDING = int(os.environ.get("ASGI_MAX_PENDING", "64"))
+# Threads running the Flask routes, as many as the Procfile gives gunicorn
+WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", "16"))
+
+executor = ThreadPoolExecutor(INFERENCE_THREADS, thread_name_prefix="gesture")
+wsgi_executor = ThreadPoolExecutor(WSGI_THREADS, thread_name_prefix="wsgi")
+_pending = 0
+
+
+class WsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs run_wsgi_app thread-sensitively, which puts every Flask
+    # request on one shared thread; run them side by side on wsgi_executor
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.run_wsgi_app.__wrapped__,
+                                 thread_sensitive=False, executor=wsgi_executor)
+
+
+class FlaskToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await WsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+wsgi_app = FlaskToAsgi(flask_app)
+
+
+def session_id(scope):
+    """Reads the session id from Flask's signed session cookie, or None."""
+    header = b"".join(value for name, value in scope.get("headers", []) if name == b"cookie")
+    if not header:
+        return None
+    cookie = SimpleCookie()
+    try:
+        cookie.load(header.decode("latin-1"))
+        morsel = cookie.get(flask_app.config["SESSION_COOKIE_NAME"])
+        if morsel is None:
+            return None
+        serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        return serializer.loads(morsel.value, max_age=max_age).get("session_id")
+    except Exception:
+        return None
+
+
+def header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def detect(sid, game, image_bytes, image_base64):
+    """The CPU-bound part of a gesture request, run on the executor."""
+    if image_base64 is not None:
+        detected = game.process_gesture_frame(image_base64)
+    else:
+        detected = game.process_gesture_bytes(image_bytes)
+    result = game.debounce_gesture(detected)
+    games.save_gesture(sid, game)
+    return result
+
+
+async def gesture(scope, receive, send):
+    global _pending
+    loop = asyncio.get_running_loop()
+    sid = session_id(scope)
+    game = await loop.run_in_executor(None, games.get, sid) if sid else None
+    if game is None or header(scope, b"content-type").startswith("multipart/"):
+        # New sessions and multipart uploads take the regular Flask route
+        return await wsgi_app(scope, receive, send)
+    # As app.get_game does: finds the session's per-process vision state
+    game.session_id = sid
+
+    body = await read_body(receive)
+    if body is None:
+        return
+    image_bytes, image_base64 = body, None
+    if scope["path"] == "/api/gesture":
+        try:
+            image_base64 = json.loads(body).get("image")
+        except Exception:
+            image_base64 = None
+        if not image_base64:
+            return await send_json(send, 400, {"error": "No image provided"})
+    elif not body:
+        return await send_json(send, 400, {"error": "No image provided"})
+
+    if _pending >= MAX_PENDING:
+        return await send_json(send, 503, {"error": "Gesture service busy", "pacing": pacer.advice()})
+    _pending += 1
+    try:
+        # Tracked from here so frames waiting for the executor count as load
+        with pacer.track():
+            result = await loop.run_in_executor(executor, detect, sid, game, image_bytes, image_base64)
+    finally:
+        _pending -= 1
+    result["pacing"] = pacer.advice()
+    await send_json(send, 200, result)
+
+
+async def gesture_stream(scope, receive, send):
+    """Same protocol as the flask-sock /ws/gesture route in app.py."""
+    loop = asyncio.get_running_loop()
+    if (await receive())["type"] != "websocket.connect":
+        return
+    sid = session_id(scope)
+    game = await loop.run_in_executor(None, games.get, sid) if sid else None
+    await send({"type": "websocket.accept"})
+    if game is None:
+        await send({"type": "websocket.send", "text": json.dumps({"error": "No game session"})})
+        await send({"type": "websocket.close", "code": 1008})
+        return
+    game.session_id = sid
+
+    with GestureStream(game) as stream:
+        if stream.hands is None:
+            await send({"type": "websocket.send", "text": json.dumps({"error": "No gesture detector available"})})
+            await send({"type": "websocket.close", "code": 1013})
+            return
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") == "reset":
+                stream.reset()
+                continue
+            frame = message.get("bytes")
+            if not frame:
+                continue
+            event = await loop.run_in_executor(executor, stream.feed, frame)
+            if event:
+                await send({"type": "websocket.send", "text": json.dumps(event)})
+
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=False, cancel_futures=True)
+            wsgi_executor.shutdown(wait=False, cancel_futures=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(scope, receive, send)
+    if scope["type"] == "websocket":
+        if scope["path"] == "/ws/gesture":
+            return await gesture_stream(scope, receive, send)
+        return await send({"type": "websocket.close", "code": 1000})
+    if scope["method"] == "POST" and scope["path"] in ("/api/gesture", "/api/gesture/frame"):
+        return await gesture(scope, receive, send)
+    return await wsgi_app(scope, receive, send)
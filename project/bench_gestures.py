@@ -0,0 +1,247 @@
+"""
+Gesture pipeline benchmark and accuracy check.
+
+Replays recorded frames through the same stages as the server
+(decode -> colour convert -> MediaPipe -> classify) and reports per-stage
+timings, fps, peak memory and accuracy against a labels file.
+
+    python bench_gestures.py                          # bundled synthetic frames
+    python bench_gestures.py recordings/ --labels recordings/labels.csv
+    python bench_gestures.py session.mp4 --video-mode --repeat 3
+    python bench_gestures.py --make-synthetic benchmarks/frames
+
+A labels file is CSV with "frame,label" rows, where frame is a file name
+(or frame index for videos) and label is snake, water, gun, detected or none.
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from gestures import classify, landmarks_to_array
+from hand_pool import load_hands_module
+from inference import IMAGE_EXTENSIONS, FramePreprocessor
+
+FRAMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "frames")
+STAGES = ("decode", "color", "inference", "classify")
+
+
+def load_frames(source, jpeg_quality=80):
+    """
+    Returns [(name, encoded bytes)] from a directory of images or a video file.
+    Video frames are re-encoded as JPEG so decode is timed like an upload.
+    """
+    if os.path.isdir(source):
+        frames = []
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(source, name), "rb") as f:
+                    frames.append((name, f.read()))
+        return frames
+
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        if ok:
+            frames.append((str(len(frames)), encoded.tobytes()))
+    cap.release()
+    return frames
+
+
+def load_labels(path):
+    labels = {}
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and not row[0].startswith("#") and row[0] != "frame":
+                labels[row[0].strip()] = row[1].strip()
+    return labels
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run(frames, hands, max_side, repeat=1):
+    """Times every stage for every frame. Returns (timings in ns per stage, predictions)."""
+    preprocessor = FramePreprocessor(max_side)
+    clock = time.perf_counter_ns
+    timings = {stage: [] for stage in STAGES}
+    predictions = {}
+
+    for _ in range(repeat):
+        for name, image_bytes in frames:
+            t0 = clock()
+            frame = preprocessor.decode(image_bytes)
+            t1 = clock()
+            timings["decode"].append(t1 - t0)
+            if frame is None:
+                predictions[name] = "error"
+                continue
+            rgb = preprocessor.to_rgb(frame)
+            t2 = clock()
+            timings["color"].append(t2 - t1)
+            if hands is None:
+                continue
+
+            result = hands.process(rgb)
+            t3 = clock()
+            timings["inference"].append(t3 - t2)
+
+            gesture = "none"
+            if result.multi_hand_landmarks:
+                points = landmarks_to_array(result.multi_hand_landmarks[0])
+                points[:, 0] = 1 - points[:, 0]
+                gesture = classify(points)
+            timings["classify"].append(clock() - t3)
+            predictions[name] = gesture
+    return timings, predictions
+
+
+def summarize(timings, frame_count, wall_seconds, predictions, labels):
+    report = {"frames": frame_count, "wall_seconds": round(wall_seconds, 3),
+              "fps": round(frame_count / wall_seconds, 1) if wall_seconds else 0,
+              "peak_rss_mb": round(peak_rss_mb(), 1), "stages_ms": {}}
+    for stage in STAGES:
+        values = np.array(timings[stage], dtype=np.float64) / 1e6
+        if values.size == 0:
+            continue
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        report["stages_ms"][stage] = {"mean": round(values.mean(), 3), "p50": round(p50, 3),
+                                      "p95": round(p95, 3), "p99": round(p99, 3)}
+
+    scored = [name for name in labels if name in predictions]
+    if scored:
+        correct = sum(predictions[name] == labels[name] for name in scored)
+        confusion = {}
+        for name in scored:
+            key = f"{labels[name]} -> {predictions[name]}"
+            confusion[key] = confusion.get(key, 0) + 1
+        report["accuracy"] = round(correct / len(scored), 4)
+        report["labelled_frames"] = len(scored)
+        report["confusion"] = dict(sorted(confusion.items()))
+    return report
+
+
+def print_report(report, detector):
+    print(f'\n{report["frames"]} frames in {report["wall_seconds"]}s -> {report["fps"]} fps '
+          f'(detector: {detector}), peak RSS {report["peak_rss_mb"]} MB')
+    print("\nStage (ms)      mean      p50      p95      p99")
+    for stage, stats in report["stages_ms"].items():
+        print(f'  {stage:<10} {stats["mean"]:>8} {stats["p50"]:>8} {stats["p95"]:>8} {stats["p99"]:>8}')
+    if "accuracy" in report:
+        print(f'\nAccuracy: {report["accuracy"]:.1%} over {report["labelled_frames"]} labelled frames')
+        for key, count in report["confusion"].items():
+            print(f"  {key:<24} {count}")
+
+
+# --- Synthetic frames ---
+# Flat cartoon hands: enough to exercise decode and colour conversion on a
+# CPU-only box without recordings. MediaPipe rarely finds a hand in them, so
+# use real recordings for accuracy numbers.
+
+SKIN = (140, 180, 225)
+
+
+def draw_hand(fingers_up, size=(480, 640), seed=0):
+    rng = np.random.default_rng(seed)
+    height, width = size
+    image = np.full((height, width, 3), rng.integers(40, 90, 3), np.uint8)
+    # Sensor-like noise so the JPEGs are not trivially compressible
+    image = cv2.add(image, rng.integers(0, 12, image.shape, dtype=np.uint8))
+    cx, cy = width // 2 + int(rng.integers(-60, 60)), height // 2 + 60
+    cv2.ellipse(image, (cx, cy), (80, 95), 0, 0, 360, SKIN, -1)
+    cv2.ellipse(image, (cx - 95, cy + 10), (22, 55), -35, 0, 360, SKIN, -1)  # thumb
+    for i, up in enumerate(fingers_up):
+        x = cx - 60 + i * 40
+        top = cy - 230 if up else cy - 110
+        cv2.rectangle(image, (x - 15, top), (x + 15, cy - 60), SKIN, -1)
+        cv2.circle(image, (x, top), 15, SKIN, -1)
+    return image
+
+
+SYNTHETIC_POSES = {
+    "gun": (False, False, False, False),
+    "water": (True, True, True, True),
+    "snake": (True, True, False, False),
+    "detected": (True, False, False, False),
+}
+
+
+def make_synthetic(directory, per_pose=2):
+    os.makedirs(directory, exist_ok=True)
+    rows = []
+    for pose, fingers in SYNTHETIC_POSES.items():
+        for i in range(per_pose):
+            name = f"{pose}_{i}.jpg"
+            cv2.imwrite(os.path.join(directory, name), draw_hand(fingers, seed=i), [cv2.IMWRITE_JPEG_QUALITY, 70])
+            rows.append((name, pose))
+    background = draw_hand((), seed=99)
+    background[:] = background.mean(axis=(0, 1)).astype(np.uint8)
+    cv2.imwrite(os.path.join(directory, "empty_0.jpg"), background, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    rows.append(("empty_0.jpg", "none"))
+    with open(os.path.join(directory, "labels.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("frame", "label"))
+        writer.writerows(rows)
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", nargs="?", default=FRAMES_DIR, help="directory of images or a video file")
+    parser.add_argument("--labels", help="CSV of frame,label (default: labels.csv next to the frames)")
+    parser.add_argument("--max-side", type=int, default=FramePreprocessor().max_side,
+                        help="detection resolution, 0 for full size")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the frame set")
+    parser.add_argument("--video-mode", action="store_true", help="tracking detector instead of static images")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--make-synthetic", metavar="DIR", help="write the synthetic frame set to DIR and exit")
+    args = parser.parse_args(argv)
+
+    if args.make_synthetic:
+        print(f"Wrote {make_synthetic(args.make_synthetic)} frames to {args.make_synthetic}")
+        return 0
+
+    frames = load_frames(args.source)
+    if not frames:
+        print(f"No frames found in {args.source}")
+        return 1
+    labels_path = args.labels or (os.path.join(args.source, "labels.csv") if os.path.isdir(args.source) else None)
+    labels = load_labels(labels_path) if labels_path and os.path.exists(labels_path) else {}
+
+    module = load_hands_module()
+    hands = None
+    if module is not None:
+        hands = module.Hands(static_image_mode=not args.video_mode, max_num_hands=1,
+                             min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    else:
+        print("MediaPipe hands unavailable: timing decode and colour conversion only.")
+
+    start = time.perf_counter()
+    timings, predictions = run(frames, hands, args.max_side, args.repeat)
+    wall = time.perf_counter() - start
+    if hands is not None:
+        hands.close()
+
+    report = summarize(timings, len(frames) * args.repeat, wall, predictions, labels)
+    print_report(report, "none" if hands is None else ("video" if args.video_mode else "static"))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
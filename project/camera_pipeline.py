@@ -0,0 +1,284 @@
+import glob
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from gestures import classify, landmarks_to_array
+from hand_pool import load_hands_module
+from inference import IMAGE_EXTENSIONS
+from rules import CLASSIC
+
+# --- Camera pipeline for the CLI (python file.py) ---
+# capture thread -> bounded drop-oldest queue -> inference thread -> render.
+# The camera keeps running at its own rate however long MediaPipe takes; the
+# inference thread always works on the freshest frames and the render stage
+# (main thread, since imshow has to be) shows the latest result with fps and
+# latency. It stays open across rounds. Sources can also be a video file or a
+# directory/glob of images, which together with headless=True runs without a
+# camera or a display.
+
+DEFAULT_QUEUE_SIZE = 2
+# Frame rate video files and image sequences are replayed at, like a camera
+DEFAULT_REPLAY_FPS = 30.0
+# Longest the render loop sleeps between checks for a new result
+RENDER_INTERVAL = 1 / 60
+WINDOW = "Gesture Mode"
+
+# Bones between the 21 landmarks, to draw a hand without mediapipe.solutions.drawing_utils
+HAND_CONNECTIONS = ((0, 1), (1, 2), (2, 3), (3, 4), (0, 5), (5, 6), (6, 7), (7, 8), (5, 9), (9, 10),
+                    (10, 11), (11, 12), (9, 13), (13, 14), (14, 15), (15, 16), (13, 17), (17, 18),
+                    (18, 19), (19, 20), (0, 17))
+
+
+def _rate(current, seconds):
+    """Smoothed events per second, given the time since the previous event."""
+    if seconds <= 0:
+        return current
+    return 1 / seconds if current == 0 else current * 0.9 + 0.1 / seconds
+
+
+class FrameSource:
+    """A camera index, a video file, or a directory/glob of images, read one frame at a time."""
+
+    def __init__(self, source=0, fps=None):
+        self.is_camera = isinstance(source, int) or str(source).isdigit()
+        self.capture = None
+        self.images = None
+        if self.is_camera:
+            self.capture = cv2.VideoCapture(int(source))
+        elif os.path.isdir(source) or glob.has_magic(source):
+            pattern = os.path.join(source, "*") if os.path.isdir(source) else source
+            self.images = deque(sorted(path for path in glob.glob(pattern)
+                                       if path.lower().endswith(IMAGE_EXTENSIONS)))
+        else:
+            self.capture = cv2.VideoCapture(source)
+            if fps is None:
+                fps = self.capture.get(cv2.CAP_PROP_FPS) or None
+        # Cameras pace themselves; files are replayed at `fps` (0 = as fast as possible)
+        fps = DEFAULT_REPLAY_FPS if fps is None else fps
+        self.interval = 0 if self.is_camera or fps <= 0 else 1 / fps
+        self._due = None
+
+    def read(self):
+        """The next BGR frame, or None when the source is exhausted or broken."""
+        if self.interval:
+            now = time.perf_counter()
+            if self._due is not None and self._due > now:
+                time.sleep(self._due - now)
+            self._due = max(now, self._due or now) + self.interval
+
+        if self.images is not None:
+            while self.images:
+                frame = cv2.imread(self.images.popleft())
+                if frame is not None:
+                    return frame
+            return None
+
+        for _ in range(10 if self.is_camera else 1):
+            ok, frame = self.capture.read()
+            if ok:
+                return frame
+        if self.is_camera:
+            print("Camera error: Could not read frames.")
+        return None
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+
+
+class CameraPipeline:
+    def __init__(self, source=0, queue_size=DEFAULT_QUEUE_SIZE, headless=False, mirror=None,
+                 fps=None, hands=None):
+        self.source = FrameSource(source, fps)
+        # Selfie view for cameras, as before; recordings are shown as they are
+        self.mirror = self.source.is_camera if mirror is None else mirror
+        self.headless = headless
+        self.hands = hands
+        self.running = False
+        self.captured = 0
+        self.processed = 0
+        self.dropped = 0
+        self.capture_fps = 0.0
+        self.inference_fps = 0.0
+        self.latency = 0.0  # capture -> classification, seconds
+        self._frames = deque(maxlen=max(1, int(queue_size)))  # (captured at, frame)
+        self._latest = None  # newest inference result
+        self._source_done = False
+        self._exhausted = False
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def start(self):
+        if self.running:
+            return self
+        if self.hands is None:
+            module = load_hands_module()
+            if module is None:
+                raise RuntimeError("MediaPipe hands unavailable")
+            # Video mode: track the hand between frames instead of searching every frame
+            self.hands = module.Hands(static_image_mode=False, max_num_hands=1,
+                                      min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        self.running = True
+        for name, target in (("capture", self._capture), ("inference", self._infer)):
+            thread = threading.Thread(target=target, name=f"camera-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        self.source.close()
+        if self.hands is not None:
+            self.hands.close()
+            self.hands = None
+        if not self.headless:
+            cv2.destroyAllWindows()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _capture(self):
+        last = time.perf_counter()
+        while self.running:
+            frame = self.source.read()
+            if frame is None:
+                break
+            if self.mirror:
+                frame = cv2.flip(frame, 1)
+            now = time.perf_counter()
+            with self._cond:
+                if len(self._frames) == self._frames.maxlen:
+                    self.dropped += 1  # the deque drops the oldest frame
+                self._frames.append((now, frame))
+                self.captured += 1
+                self._cond.notify_all()
+            self.capture_fps = _rate(self.capture_fps, now - last)
+            last = now
+        with self._cond:
+            self._source_done = True
+            self._cond.notify_all()
+
+    def _infer(self):
+        last = time.perf_counter()
+        while True:
+            with self._cond:
+                while self.running and not self._frames and not self._source_done:
+                    self._cond.wait()
+                if not self.running or not self._frames:
+                    break
+                captured, frame = self._frames.popleft()
+
+            result = self.hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            points = gesture = None
+            if result.multi_hand_landmarks:
+                points = landmarks_to_array(result.multi_hand_landmarks[0])
+                gesture = classify(points)
+
+            now = time.perf_counter()
+            with self._cond:
+                self.processed += 1
+                self._latest = {"seq": self.processed, "frame": frame, "points": points,
+                                "gesture": gesture, "captured": captured}
+                self.latency = now - captured
+                self._cond.notify_all()
+            self.inference_fps = _rate(self.inference_fps, now - last)
+            last = now
+        with self._cond:
+            self._exhausted = True
+            self._cond.notify_all()
+
+    @property
+    def exhausted(self):
+        """True once the source ended or failed and every frame it gave was processed."""
+        return self._exhausted
+
+    def stats(self):
+        return {"capture_fps": round(self.capture_fps, 1), "inference_fps": round(self.inference_fps, 1),
+                "latency_ms": round(self.latency * 1000, 1), "captured": self.captured,
+                "processed": self.processed, "dropped": self.dropped}
+
+    def next_gesture(self, ready=0.0, timeout=None, hold=0.5):
+        """
+        Waits for snake, water or gun in a frame captured at least `ready`
+        seconds from now, rendering every result on the way. Shows the hit
+        for `hold` seconds. Returns the gesture, or None on timeout, ESC or
+        the end of the source. The preview window is closed again before
+        returning: only this loop pumps its events, so between rounds it
+        would just sit there frozen.
+        """
+        try:
+            return self._next_gesture(ready, timeout, hold)
+        finally:
+            if not self.headless:
+                try:
+                    cv2.destroyWindow(WINDOW)
+                    cv2.waitKey(1)
+                except cv2.error:
+                    pass
+
+    def _next_gesture(self, ready, timeout, hold):
+        start = time.perf_counter() + ready
+        deadline = None if timeout is None else start + timeout
+        seen = 0
+        while True:
+            with self._cond:
+                if (self._latest is None or self._latest["seq"] == seen) and not self._exhausted:
+                    self._cond.wait(RENDER_INTERVAL)
+                latest, exhausted = self._latest, self._exhausted
+            now = time.perf_counter()
+
+            if latest is not None and latest["seq"] != seen:
+                seen = latest["seq"]
+                found = latest["captured"] >= start and latest["gesture"] in CLASSIC.moves
+                if not self.headless:
+                    self.render(latest, start - now, latest["gesture"] if found else None)
+                if found:
+                    self._hold(hold)
+                    return latest["gesture"]
+            elif exhausted:
+                return None
+
+            if not self.headless and cv2.waitKey(1) & 0xFF == 27:  # ESC
+                return None
+            if deadline is not None and now > deadline:
+                return None
+
+    def _hold(self, seconds):
+        if self.headless:
+            return
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            cv2.waitKey(10)
+
+    def render(self, result, countdown=0.0, gesture=None):
+        frame = result["frame"]
+        height, width = frame.shape[:2]
+        points = result["points"]
+        if points is not None:
+            pixels = [(int(x * width), int(y * height)) for x, y in points[:, :2]]
+            for a, b in HAND_CONNECTIONS:
+                cv2.line(frame, pixels[a], pixels[b], (255, 255, 255), 2)
+            for pixel in pixels:
+                cv2.circle(frame, pixel, 4, (0, 0, 255), -1)
+
+        title = f"Get ready... {countdown:.1f}s" if countdown > 0 else "Show Gesture"
+        cv2.putText(frame, title, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        if gesture:
+            cv2.putText(frame, f"Detected: {gesture.upper()}", (20, 80),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+        overlay = (f"camera {self.capture_fps:.0f} fps | model {self.inference_fps:.0f} fps | "
+                   f"latency {self.latency * 1000:.0f} ms | dropped {self.dropped}")
+        cv2.putText(frame, overlay, (20, height - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+        cv2.imshow(WINDOW, frame)
@@ -1,158 +1,490 @@
+import os
 import random
-import cv2
-import mediapipe as mp
-import numpy as np
 import base64
+import hashlib
+import json
+import threading
+import time
+from types import MappingProxyType
+from collections import Counter, OrderedDict, deque
+import metrics
+from hand_pool import get_pool
+from match_log import get_match_log
+from rules import CLASSIC as RULES, TIE, USER_WINS, WINNERS
+from strategies import UNKNOWN_MOVE_ID, NGramModel, get_strategy
+
+GESTURE_MOVES = RULES.moves
+# Largest landmark shift (normalised image units) still treated as "hand did not move"
+STILL_HAND_THRESHOLD = 0.01
+# Seconds a request waits on the inference queue before giving up on its frame
+INFERENCE_TIMEOUT = 2.0
+
+# Per-session cache of recent frame results: FRAME_CACHE=bytes (default) keys
+# frames by a hash of the upload, so only exact repeats hit; phash keys them
+# by a 9x8 perceptual hash of the whole frame, which catches a held pose but
+# also maps different gestures in the same scene to one key, trading accuracy
+# for hits; off disables it. See configure_frame_cache().
+FRAME_CACHE_MODE = os.environ.get("FRAME_CACHE", "bytes")
+FRAME_CACHE_SIZE = int(os.environ.get("FRAME_CACHE_SIZE", "8"))
+FRAME_CACHE_TTL = float(os.environ.get("FRAME_CACHE_TTL", "2.0"))
+# Sessions whose transient vision state (see VisionState) this process keeps
+VISION_STATES_MAX = int(os.environ.get("SESSION_MAX", "10000"))
+
+# Hard-mode move frequencies: weight of older rounds is multiplied by AI_DECAY
+# every round (1 = plain counts), and AI_WINDOW > 0 only counts that many
+# recent rounds. Both are O(1) per round.
+MOVE_DECAY = float(os.environ.get("AI_DECAY", "1.0"))
+MOVE_WINDOW = int(os.environ.get("AI_WINDOW", "0"))
+
+# One-letter codes for serialised state ("?" stands for an unknown move)
+MOVE_CODES = {"snake": "s", "water": "w", "gun": "g", "detected": "d", None: "-"}
+CODE_MOVES = {code: move for move, code in MOVE_CODES.items()}
+# Order of the fields in Game.dump(); bump STATE_VERSION when it changes
+STATE_VERSION = 4
+STATE_FIELDS = ("user_score", "computer_score", "tie_score", "rounds", "computer_streak",
+                "user_streak", "repetitive_count", "last_move", "avatar", "input_mode", "difficulty")
+
+# Index of each move in the history bytearray (the rules' move ids)
+MOVE_IDS = RULES.ids
+_ID_TO_LETTER = bytearray(b"?" * 256)
+_LETTER_TO_ID = bytearray([UNKNOWN_MOVE_ID] * 256)
+for _move, _move_id in MOVE_IDS.items():
+    _ID_TO_LETTER[_move_id] = ord(MOVE_CODES[_move])
+    _LETTER_TO_ID[ord(MOVE_CODES[_move])] = _move_id
+_ID_TO_LETTER, _LETTER_TO_ID = bytes(_ID_TO_LETTER), bytes(_LETTER_TO_ID)
+
+ROUND_MESSAGES = {"tie": "It's a tie! 🤝", "user": "You won! 🥳", "computer": "Computer won! 🤖"}
+
+# Personalities are shared by every session and never change
+AVATARS = MappingProxyType({
+    "rusty": MappingProxyType({
+        "name": "Rusty",
+        "catchphrase": "Let's see if you can handle the pro!",
+        "win": ("Calculated. 📈", "Too easy! Try harder next time.", "My algorithms are superior.", "Victory is logical."),
+        "loss": ("An anomaly in my data...", "Wait, that wasn't supposed to happen.", "Nice move... for a human.", "I need a reboot after that one."),
+        "tie": ("A statistical stalemate.", "We are perfectly matched.", "Interesting choice.", "Back to square one."),
+        "advice": ("You're leaning on {move} too much. Predictable.", "My sensors detect a pattern. Shake it up!", "High probability you'll lose if you keep this up.")
+    }),
+    "zappy": MappingProxyType({
+        "name": "Zappy",
+        "catchphrase": "Ready to get zapped by my awesome moves?",
+        "win": ("BOOM! Roasted! 🔥", "ZAP! Gotcha!", "I'm on fire today!", "Can't touch this! ⚡"),
+        "loss": ("Ouch! That hurt!", "Hey! No fair!", "You got lucky that time!", "I'm still the coolest though! 😎"),
+        "tie": ("Copycat! 🐈", "Stop reading my mind!", "Let's go again, double time!", "Twin powers, activate!"),
+        "advice": ("Boring! Try something new!", "You're acting like a robot! Oh wait, that's me!", "Mix it up or I'll zap you!")
+    }),
+    "luna": MappingProxyType({
+        "name": "Luna",
+        "catchphrase": "May the flow of the game guide us.",
+        "win": ("The tides have turned in my favor.", "Balance is restored.", "A graceful victory.", "Walk in peace, but I won."),
+        "loss": ("A lesson in humility for me.", "You have found your center.", "The universe smiles upon you.", "Well played, traveler."),
+        "tie": ("We are one with the game.", "Harmonious result.", "Peaceful coexistence.", "Energy in equilibrium."),
+        "advice": ("Seek the path less traveled.", "Your spirit is repetitive.", "Let go of your attachment to {move}.")
+    })
+})
+
+
+# --- Vision stack ---
+# OpenCV, NumPy and MediaPipe take seconds and hundreds of MB to import, so
+# they are only loaded on the first gesture frame (or by preload_vision).
+# Keyboard sessions work without them installed at all.
+_vision = None
+_classifier = None
+
+
+def load_vision():
+    """Imports the gesture pipeline (inference.py). Returns it, or None if unavailable."""
+    global _vision
+    if _vision is None:
+        try:
+            import inference
+            _vision = inference
+        except Exception as e:
+            print(f"Gesture pipeline unavailable, keyboard mode only. Error: {e}")
+            _vision = False
+    return _vision or None
+
+
+def load_classifier():
+    """
+    Imports just the landmark classifier (gestures.py, NumPy only) for
+    clients that send landmarks instead of frames. Returns it, or None.
+    """
+    global _classifier
+    if _classifier is None:
+        try:
+            import gestures
+            _classifier = gestures
+        except Exception as e:
+            print(f"Gesture classifier unavailable. Error: {e}")
+            _classifier = False
+    return _classifier or None
+
+
+def preload_vision(detectors=0):
+    """
+    Loads the vision stack ahead of the first frame, and optionally builds
+    `detectors` pooled Hands graphs. Returns False if it is unavailable.
+    """
+    vision = load_vision()
+    if vision is None:
+        return False
+    # Importing mediapipe is most of the cost even before any detector exists
+    from hand_pool import load_hands_module
+    load_hands_module()
+    if detectors:
+        get_pool().warm_up(detectors)
+    return True
+
+
+def encode_moves(moves):
+    return "".join(MOVE_CODES.get(move, "?") for move in moves)
+
+
+def decode_moves(codes):
+    return [CODE_MOVES.get(code, "?") for code in codes]
+
+
+# --- Gesture debouncing ---
+class GestureFilter:
+    """
+    Majority vote over the last `window` raw classifications with hysteresis:
+    a gesture is committed once it holds the majority with at least
+    `min_votes` frames, and stays committed until something else does.
+    """
+    __slots__ = ("window", "min_votes", "stable", "confidence")
+
+    def __init__(self, window=5, min_votes=2):
+        self.window = deque(maxlen=max(1, int(window)))
+        self.min_votes = max(1, int(min_votes))
+        self.stable = None
+        self.confidence = 0.0
+
+    def reset(self):
+        self.window.clear()
+        self.stable = None
+        self.confidence = 0.0
+
+    def update(self, raw):
+        """
+        Adds one raw classification.
+        Returns True when the stable gesture changed on this frame.
+        """
+        self.window.append(raw)
+        leader, votes = Counter(self.window).most_common(1)[0]
+        self.confidence = votes / len(self.window)
+
+        if leader == self.stable:
+            return False
+        if votes >= self.min_votes and votes * 2 > len(self.window):
+            self.stable = leader
+            return True
+        return False
+
+
+# --- Frame result cache ---
+class FrameCache:
+    """Last few frame keys of one session and what they classified as, LRU with a TTL."""
+    __slots__ = ("size", "ttl", "hits", "misses", "_entries")
+
+    def __init__(self, size=None, ttl=None):
+        self.size = max(1, int(FRAME_CACHE_SIZE if size is None else size))
+        self.ttl = FRAME_CACHE_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored at, result), oldest first
+
+    def get(self, key):
+        """Returns (True, result) on a hit and (False, None) on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.inc("gesture_cache_total", label="result", value="hit")
+            return True, entry[1]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        metrics.inc("gesture_cache_total", label="result", value="miss")
+        return False, None
+
+    def put(self, key, result):
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+# --- Per-process vision state ---
+# The last hand seen (for the ROI crop and the still-hand skip) and the frame
+# cache are only worth anything inside the process that produced them, and
+# are never serialised. They live in a side table keyed by session id rather
+# than on the Game, so they survive stores that rebuild the Game from its
+# dump on every request (SQLiteStore).
+class VisionState:
+    __slots__ = ("last_landmarks", "last_raw", "_frame_cache")
+
+    def __init__(self):
+        self.last_landmarks = None
+        self.last_raw = None
+        self._frame_cache = None
+
+    @property
+    def frame_cache(self):
+        if self._frame_cache is None:
+            self._frame_cache = FrameCache()
+        return self._frame_cache
+
+
+_vision_states = OrderedDict()  # sid -> VisionState, least recently used first
+_vision_states_lock = threading.Lock()
+
+
+def vision_state(sid):
+    """The process's VisionState for a session; a private one when there is no sid."""
+    if sid is None:
+        return VisionState()
+    with _vision_states_lock:
+        state = _vision_states.get(sid)
+        if state is None:
+            state = _vision_states[sid] = VisionState()
+            if len(_vision_states) > VISION_STATES_MAX:
+                _vision_states.popitem(last=False)
+        else:
+            _vision_states.move_to_end(sid)
+        return state
+
+
+def frame_key(image_bytes, vision):
+    """Cache key of an encoded frame under FRAME_CACHE_MODE, or None when caching is off."""
+    if FRAME_CACHE_MODE == "phash":
+        return vision.frame_hash(image_bytes)
+    if FRAME_CACHE_MODE == "bytes":
+        return hashlib.blake2b(image_bytes, digest_size=8).digest()
+    return None
+
+
+def configure_frame_cache(mode=None, size=None, ttl=None):
+    """
+    Changes the frame cache settings, e.g. mode="off" for benchmarks.
+    Mode applies at once; size and ttl apply to caches created afterwards.
+    """
+    global FRAME_CACHE_MODE, FRAME_CACHE_SIZE, FRAME_CACHE_TTL
+    if mode is not None:
+        FRAME_CACHE_MODE = mode
+    if size is not None:
+        FRAME_CACHE_SIZE = size
+    if ttl is not None:
+        FRAME_CACHE_TTL = ttl
 
 # --- Game Logic ---
 class Game:
+    # A session is just these fields; history is one byte per round
+    __slots__ = ("user_score", "computer_score", "tie_score", "rounds", "history", "move_counts", "_ngram",
+                 "computer_streak", "user_streak", "repetitive_count", "last_move",
+                 "avatar", "input_mode", "difficulty",
+                 "_gesture_filter", "_vision_state", "session_id")
+
+    avatars = AVATARS
+
     def __init__(self):
         self.user_score = 0
         self.computer_score = 0
         self.tie_score = 0
         self.rounds = 1
-        self.history = []
+        self.history = bytearray()  # MOVE_IDS of the user's moves
+        self.move_counts = [0.0, 0.0, 0.0]  # (decayed) count of each move id
+        self._ngram = None  # built when a strategy first needs it
         self.computer_streak = 0
         self.user_streak = 0
         self.repetitive_count = 0
         self.last_move = None
         self.avatar = "rusty" # Default avatar
-        
-        self.avatars = {
-            "rusty": {
-                "name": "Rusty",
-                "catchphrase": "Let's see if you can handle the pro!",
-                "win": ["Calculated. 📈", "Too easy! Try harder next time.", "My algorithms are superior.", "Victory is logical."],
-                "loss": ["An anomaly in my data...", "Wait, that wasn't supposed to happen.", "Nice move... for a human.", "I need a reboot after that one."],
-                "tie": ["A statistical stalemate.", "We are perfectly matched.", "Interesting choice.", "Back to square one."],
-                "advice": ["You're leaning on {move} too much. Predictable.", "My sensors detect a pattern. Shake it up!", "High probability you'll lose if you keep this up."]
-            },
-            "zappy": {
-                "name": "Zappy",
-                "catchphrase": "Ready to get zapped by my awesome moves?",
-                "win": ["BOOM! Roasted! 🔥", "ZAP! Gotcha!", "I'm on fire today!", "Can't touch this! ⚡"],
-                "loss": ["Ouch! That hurt!", "Hey! No fair!", "You got lucky that time!", "I'm still the coolest though! 😎"],
-                "tie": ["Copycat! 🐈", "Stop reading my mind!", "Let's go again, double time!", "Twin powers, activate!"],
-                "advice": ["Boring! Try something new!", "You're acting like a robot! Oh wait, that's me!", "Mix it up or I'll zap you!"]
-            },
-            "luna": {
-                "name": "Luna",
-                "catchphrase": "May the flow of the game guide us.",
-                "win": ["The tides have turned in my favor.", "Balance is restored.", "A graceful victory.", "Walk in peace, but I won."],
-                "loss": ["A lesson in humility for me.", "You have found your center.", "The universe smiles upon you.", "Well played, traveler."],
-                "tie": ["We are one with the game.", "Harmonious result.", "Peaceful coexistence.", "Energy in equilibrium."],
-                "advice": ["Seek the path less traveled.", "Your spirit is repetitive.", "Let go of your attachment to {move}."]
-            }
-        }
-        
-        # Init Gesture (static_image_mode=True for separate frame requests)
-        self.mp_hands = None
-        try:
-            import mediapipe as mp
-            # Try different ways to access solutions in case of weird installation
-            mp_hands_module = None
-            if hasattr(mp, 'solutions'):
-                mp_hands_module = mp.solutions.hands
-            else:
-                # Fallback if solutions is missing but module exists
-                try:
-                    import mediapipe.python.solutions.hands as mp_hands_module
-                except:
-                    pass
-            
-            if mp_hands_module:
-                self.mp_hands = mp_hands_module.Hands(
-                    static_image_mode=True,
-                    max_num_hands=1, 
-                    min_detection_confidence=0.5,
-                    min_tracking_confidence=0.5
-                )
-                print("Mediapipe hands initialized successfully via solution mapping.")
-            else:
-                print("Mediapipe module found but 'solutions' attribute is missing. Gesture mode will be limited.")
-        except Exception as e:
-            print(f"Mediapipe Initialization Error: {e}")
-            self.mp_hands = None
-
         self.input_mode = "1"
         self.difficulty = "easy"
 
+        # Gesture state is only built once the session sends a frame
+        self._gesture_filter = None
+        self._vision_state = None
+        # Set by whoever owns the session (app.get_game); tags the match log
+        # and finds the session's VisionState
+        self.session_id = None
+
+    @property
+    def ngram(self):
+        if self._ngram is None:
+            self._ngram = NGramModel()
+        return self._ngram
+
+    @property
+    def gesture_filter(self):
+        if self._gesture_filter is None:
+            self._gesture_filter = GestureFilter()
+        return self._gesture_filter
+
+    @property
+    def vision_state(self):
+        if self._vision_state is None:
+            self._vision_state = vision_state(self.session_id)
+        return self._vision_state
+
+    @property
+    def frame_cache(self):
+        return self.vision_state.frame_cache
 
     def reset_stats(self):
         self.user_score = 0
         self.computer_score = 0
         self.tie_score = 0
         self.rounds = 1
-        self.history = []
+        self.history = bytearray()
+        self.move_counts = [0.0, 0.0, 0.0]
+        self._ngram = None
         self.computer_streak = 0
         self.user_streak = 0
         self.repetitive_count = 0
         self.last_move = None
+        self.reset_gesture()
+
+    def dump(self):
+        """
+        Compact JSON of the session state for external session stores.
+        Leaves out per-process gesture caches and the debounce state, which
+        is saved on its own (dump_gesture).
+        """
+        state = [STATE_VERSION] + [getattr(self, name) for name in STATE_FIELDS]
+        state += [self.history.translate(_ID_TO_LETTER).decode("ascii"),
+                  [round(count, 6) for count in self.move_counts],
+                  self._ngram.table if self._ngram else None]
+        return json.dumps(state, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, data):
+        """Rebuilds a Game from dump(). Returns None for unknown versions."""
+        state = json.loads(data)
+        if not state or state[0] != STATE_VERSION:
+            return None
+        game = cls()
+        values = state[1:]
+        for name, value in zip(STATE_FIELDS, values):
+            setattr(game, name, value)
+        history, game.move_counts, ngram = values[len(STATE_FIELDS):]
+        if ngram is not None:
+            # JSON object keys come back as strings
+            game._ngram = NGramModel(table={int(key): counts for key, counts in ngram.items()})
+        game.history = bytearray(history.encode("ascii", "replace").translate(_LETTER_TO_ID))
+        return game
+
+    def dump_gesture(self):
+        """
+        Just the debounce state (window codes then the stable code), which
+        gesture routes save on their own so they never write back scores.
+        """
+        gesture_filter = self._gesture_filter
+        if gesture_filter is None:
+            return ""
+        return encode_moves(gesture_filter.window) + MOVE_CODES.get(gesture_filter.stable, "?")
+
+    def load_gesture(self, data):
+        """Replaces the debounce state with one from dump_gesture()."""
+        self.reset_gesture()
+        if data:
+            self.gesture_filter.window.extend(decode_moves(data[:-1]))
+            self.gesture_filter.stable = CODE_MOVES.get(data[-1])
 
     def get_ai_choice(self):
-        choices = ["snake", "water", "gun"]
-        
-        if self.difficulty == "easy":
-            return random.choice(choices)
-        
-        if self.difficulty == "medium" and random.random() < 0.6:
-            return random.choice(choices)
-            
-        if self.difficulty == "hard":
-            if random.random() < 0.3: # Random factor
-                 return random.choice(choices)
-            # Prediction logic
-            if self.history:
-                predicted = max(set(self.history), key=self.history.count)
-                # Counter the predicted user move
-                return {"snake": "gun", "water": "snake", "gun": "water"}[predicted]
-                
-        return random.choice(choices)
+        # Each difficulty is a registered strategy (see strategies.py)
+        return GESTURE_MOVES[get_strategy(self.difficulty).choose(self)]
 
-    def play_round(self, user_choice):
-        computer_choice = self.get_ai_choice()
-        self.history.append(user_choice)
-        
-        winner = "computer"
-        message = ""
-        
-        if user_choice == computer_choice:
-            winner = "tie"
+    def _record_move(self, user_choice):
+        move_id = MOVE_IDS.get(user_choice, UNKNOWN_MOVE_ID)
+        self.history.append(move_id)
+        counts = self.move_counts
+        if MOVE_DECAY != 1.0:
+            counts[0] *= MOVE_DECAY
+            counts[1] *= MOVE_DECAY
+            counts[2] *= MOVE_DECAY
+        if move_id != UNKNOWN_MOVE_ID:
+            counts[move_id] += 1
+        if MOVE_WINDOW and len(self.history) > MOVE_WINDOW:
+            # The move leaving the window has decayed for MOVE_WINDOW rounds since
+            expired = self.history[-MOVE_WINDOW - 1]
+            if expired != UNKNOWN_MOVE_ID:
+                counts[expired] = max(0.0, counts[expired] - MOVE_DECAY ** MOVE_WINDOW)
+        get_strategy(self.difficulty).observe(self)
+        return move_id
+
+    def _resolve(self, user_choice):
+        """Scores one round. Returns (computer_choice, winner)."""
+        ai_id = get_strategy(self.difficulty).choose(self)
+        user_id = self._record_move(user_choice)
+
+        outcome = RULES.winner(user_id, ai_id)
+        if outcome == TIE:
             self.tie_score += 1
             self.user_streak = 0
             self.computer_streak = 0
-            message = "It's a tie! 🤝"
-        elif (user_choice == "snake" and computer_choice == "water") or \
-             (user_choice == "water" and computer_choice == "gun") or \
-             (user_choice == "gun" and computer_choice == "snake"):
-            winner = "user"
+        elif outcome == USER_WINS:
             self.user_score += 1
             self.user_streak += 1
             self.computer_streak = 0
-            message = "You won! 🥳"
         else:
-            winner = "computer"
             self.computer_score += 1
             self.computer_streak += 1
             self.user_streak = 0
-            message = "Computer won! 🤖"
 
+        match_log = get_match_log()
+        if match_log is not None:
+            match_log.append(self.session_id, self.rounds, user_id, ai_id, outcome, self.difficulty)
         self.rounds += 1
-        
+        return GESTURE_MOVES[ai_id], WINNERS[outcome]
+
+    def scores(self):
+        return {
+            "user": self.user_score,
+            "computer": self.computer_score,
+            "tie": self.tie_score,
+            "rounds": self.rounds
+        }
+
+    def play_round(self, user_choice):
+        computer_choice, winner = self._resolve(user_choice)
+        self.reset_gesture()
         return {
             "winner": winner,
             "computer_choice": computer_choice,
             "user_choice": user_choice,
-            "message": message,
-            "scores": {
-                "user": self.user_score,
-                "computer": self.computer_score,
-                "tie": self.tie_score,
-                "rounds": self.rounds
-            },
+            "message": ROUND_MESSAGES[winner],
+            "scores": self.scores(),
             "coach_advice": self.get_coach_advice(user_choice),
             "commentary": self.get_commentary(winner),
-            "avatar_name": self.avatars[self.avatar]["name"]
+            "avatar_name": AVATARS[self.avatar]["name"]
+        }
+
+    def play_rounds(self, moves):
+        """
+        Plays a sequence of user moves in one call, for replays and bots.
+        Leaves the game (and the random module) in the same state as calling
+        play_round for each move, but returns columns instead of round dicts.
+        """
+        computer_moves = []
+        winners = []
+        for user_choice in moves:
+            computer_choice, winner = self._resolve(user_choice)
+            # Not returned, but they track repeats and draw from the same RNG
+            self.get_coach_advice(user_choice)
+            self.get_commentary(winner)
+            computer_moves.append(computer_choice)
+            winners.append(winner)
+        self.reset_gesture()
+        return {
+            "user_moves": list(moves),
+            "computer_moves": computer_moves,
+            "winners": winners,
+            "scores": self.scores()
         }
 
     def get_coach_advice(self, user_choice):
@@ -162,18 +494,18 @@ class Game:
             self.repetitive_count = 0
         self.last_move = user_choice
 
-        personality = self.avatars[self.avatar]
+        personality = AVATARS[self.avatar]
         
         if self.repetitive_count >= 2:
             return random.choice(personality["advice"]).replace("{move}", user_choice)
         
         if self.computer_streak >= 3:
-            return f"I'm winning too much! Maybe try {random.choice(['snake', 'water', 'gun'])}?"
+            return f"I'm winning too much! Maybe try {random.choice(GESTURE_MOVES)}?"
             
         return "Keep going! You're doing great."
 
     def get_commentary(self, winner):
-        personality = self.avatars[self.avatar]
+        personality = AVATARS[self.avatar]
         if winner == "user": return random.choice(personality["loss"])
         if winner == "computer": return random.choice(personality["win"])
         return random.choice(personality["tie"])
@@ -187,63 +519,118 @@ class Game:
         try:
             if "," in image_data_base64:
                 image_data_base64 = image_data_base64.split(",")[1]
-            
-            nparr = np.frombuffer(base64.b64decode(image_data_base64), np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if frame is None or self.mp_hands is None:
-                return None
-
-            frame = cv2.flip(frame, 1)
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            result = self.mp_hands.process(rgb)
-
-            if result.multi_hand_landmarks:
-                # We saw a hand! 
-                hand_landmarks = result.multi_hand_landmarks[0]
-                
-                # --- Improved Finger Counting Logic ---
-                # tips of 4 fingers: Index (8), Middle (12), Ring (16), Pinky (20)
-                # joints: 6, 10, 14, 18 (PIP joints)
-                tips = [8, 12, 16, 20]
-                folded = 0
-                
-                # We use the distance from the wrist (0) or MCP joint to be more robust
-                # but simple Y comparison is okay if we use the PIP joint as reference.
-                for i in range(4):
-                    tip = hand_landmarks.landmark[tips[i]]
-                    pip = hand_landmarks.landmark[tips[i] - 2]
-                    
-                    # If tip.y > pip.y, the finger is folded (Y increases downwards)
-                    if tip.y > pip.y:
-                        folded += 1
-                
-                # Thumb logic: Thumb tip (4) vs Thumb MCP (2)
-                # Comparing X coordinates (after flip)
-                thumb_tip = hand_landmarks.landmark[4]
-                thumb_mcp = hand_landmarks.landmark[2]
-                thumb_folded = False
-                if abs(thumb_tip.x - hand_landmarks.landmark[17].x) < abs(thumb_mcp.x - hand_landmarks.landmark[17].x):
-                    thumb_folded = True
-                
-                # Final Gesture Logic
-                if folded == 4:
-                    return "gun"      # Fist
-                elif folded == 0:
-                    return "water"    # Open Palm
-                elif folded == 2:
-                    # Specifically Index and Middle fingers up
-                    index_folded = hand_landmarks.landmark[8].y > hand_landmarks.landmark[6].y
-                    middle_folded = hand_landmarks.landmark[12].y > hand_landmarks.landmark[10].y
-                    ring_folded = hand_landmarks.landmark[16].y > hand_landmarks.landmark[14].y
-                    pinky_folded = hand_landmarks.landmark[20].y > hand_landmarks.landmark[18].y
-                    
-                    if not index_folded and not middle_folded and ring_folded and pinky_folded:
-                        return "snake" # V-Sign
-                    return "detected" # 2 fingers, but maybe not V-sign
-                
-                return "detected" # Hand seen but no clear gesture
-                
+            with metrics.stage("base64"):
+                image_bytes = base64.b64decode(image_data_base64)
+            return self.process_gesture_bytes(image_bytes)
+        except Exception as e:
+            print(f"Gesture Error: {e}")
+            return None
+
+    def reset_gesture(self):
+        """
+        Forgets the debounced gesture once a round is played, so holding the
+        same gesture for the next round commits it again.
+        """
+        if self._gesture_filter is not None:
+            self._gesture_filter.reset()
+
+    def debounce_gesture(self, raw, gesture_filter=None):
+        """
+        Feeds a raw classification through the session's gesture filter.
+        "committed" is set only on the frame a move becomes stable, so a
+        held gesture is reported once instead of on every poll.
+        """
+        gesture_filter = gesture_filter or self.gesture_filter
+        # A frame the inference queue dropped (inference.DROPPED, so only once
+        # the vision stack is loaded) says nothing about the hand: no vote
+        if _vision and raw == _vision.DROPPED:
+            changed = False
+        else:
+            changed = gesture_filter.update(raw)
+        stable = gesture_filter.stable
+        return {
+            "gesture": raw,
+            "stable": stable,
+            "confidence": round(gesture_filter.confidence, 2),
+            "committed": stable if changed and stable in GESTURE_MOVES else None
+        }
+
+    def process_gesture_landmarks(self, points):
+        """
+        Classifies one hand's (21, 3) landmarks computed on the client, with
+        no decode or inference here. Returns the same values as
+        process_gesture_frame.
+        """
+        metrics.inc("gesture_landmarks_total")
+        classifier = load_classifier()
+        if classifier is None:
+            return None
+        state = self.vision_state
+        with metrics.stage("classify"):
+            state.last_raw = classifier.classify(points)
+        return state.last_raw
+
+    def process_gesture_bytes(self, image_bytes, hands=None):
+        """
+        Expects the raw encoded image (JPEG/WebP/PNG) as bytes or a buffer.
+        Pass `hands` to run on a detector the caller already holds (streams
+        keep a tracking detector for their whole lifetime).
+        Returns the same values as process_gesture_frame.
+        """
+        metrics.inc("gesture_frames_total")
+        vision = load_vision()
+        if vision is None:
+            return None
+        state = self.vision_state
+        try:
+            # A held pose sends near-identical frames: reuse their result without MediaPipe
+            key = frame_key(image_bytes, vision)
+            if key is not None:
+                hit, cached = state.frame_cache.get(key)
+                if hit:
+                    return cached
+
+            if hands is not None:
+                # Tracking detectors follow the hand themselves, so no crop
+                points = vision.detect_landmarks(image_bytes, hands)
+            else:
+                # Look where the hand was last time first
+                roi = vision.hand_roi(state.last_landmarks) if state.last_landmarks is not None else None
+                queue = vision.get_inference_queue()
+                if queue is not None:
+                    # Batched on the worker processes together with other sessions
+                    with metrics.stage("queue"):
+                        points = queue.infer(image_bytes, roi, INFERENCE_TIMEOUT)
+                    if points is vision.DROPPED:
+                        # Not cached, and the last hand stays the reference for the next frame
+                        return vision.DROPPED
+                else:
+                    preprocessor = vision.get_preprocessor()
+                    frame = preprocessor.decode(image_bytes)
+                    if frame is None:
+                        return None
+                    # Borrow a shared detector only for the duration of inference
+                    with get_pool().checkout() as pooled:
+                        if pooled is None:
+                            return None
+                        points = preprocessor.locate(frame, pooled, roi)
+
+            if points is not None:
+                # We saw a hand! A hand that has not moved keeps its previous classification
+                last = state.last_landmarks
+                state.last_landmarks = points
+                if last is None or state.last_raw is None or \
+                        vision.hand_moved(points, last, STILL_HAND_THRESHOLD):
+                    with metrics.stage("classify"):
+                        state.last_raw = vision.classify(points)
+                if key is not None:
+                    state.frame_cache.put(key, state.last_raw)
+                return state.last_raw
+
+            state.last_landmarks = None
+            state.last_raw = None
+            if key is not None:
+                state.frame_cache.put(key, None)
             return None
         except Exception as e:
             print(f"Gesture Error: {e}")
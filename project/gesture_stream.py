@@ -0,0 +1,61 @@
+from game_logic import GestureFilter
+from hand_pool import get_tracking_pool
+
+# --- Streaming gesture sessions ---
+# A stream holds one video-mode (tracking) detector for as long as the client
+# keeps its socket open, so MediaPipe only runs full palm detection when it
+# loses the hand instead of on every frame. Frames are classified as they
+# arrive and an event is only sent back when the stable gesture changes.
+
+DEFAULT_STABLE_FRAMES = 3
+
+
+class GestureStream:
+    def __init__(self, game, stable_frames=DEFAULT_STABLE_FRAMES, pool=None):
+        self.game = game
+        stable_frames = max(1, int(stable_frames))
+        # Frames arrive much faster than HTTP polls, so vote over a wider window
+        self.filter = GestureFilter(window=2 * stable_frames - 1, min_votes=stable_frames)
+        self.pool = pool or get_tracking_pool()
+        self.hands = None
+        self.frames = 0
+
+    def open(self, timeout=0):
+        """Borrows a tracking detector. Returns False if none is free."""
+        if self.hands is None:
+            self.hands = self.pool.acquire(timeout)
+        return self.hands is not None
+
+    def close(self):
+        if self.hands is not None:
+            self.pool.release(self.hands)
+            self.hands = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reset(self):
+        """Forgets the stable gesture, e.g. after a round was played with it."""
+        self.filter.reset()
+
+    def feed(self, image_bytes):
+        """
+        Classifies one encoded frame.
+        Returns an event dict when the stable gesture changes, otherwise None.
+        A stable "no hand" is reported as {"gesture": None}.
+        """
+        if self.hands is None:
+            return None
+        self.frames += 1
+        raw = self.game.process_gesture_bytes(image_bytes, hands=self.hands)
+        if not self.filter.update(raw):
+            return None
+        return {
+            "gesture": self.filter.stable,
+            "confidence": round(self.filter.confidence, 2),
+            "frame": self.frames
+        }
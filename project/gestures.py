@@ -0,0 +1,84 @@
+import numpy as np
+
+# --- Shared gesture classifier ---
+# Used by the web app (game_logic.py) and the CLI (python file.py) so both
+# read a hand the same way. Landmarks are handled as a (21, 3) float array
+# (x, y, z per MediaPipe hand keypoint) or a (N, 21, 3) batch of hands.
+
+WRIST = 0
+# Finger tips: Index (8), Middle (12), Ring (16), Pinky (20), and their PIP joints
+TIPS = np.array([8, 12, 16, 20])
+PIPS = TIPS - 2
+
+GESTURES = np.array(["snake", "water", "gun", "detected"], dtype=object)
+SNAKE, WATER, GUN, DETECTED = range(4)
+
+
+# Wire formats accepted for client-side landmarks: little-endian, x/y/z per
+# point, 21 points per hand, any number of hands back to back
+LANDMARK_DTYPES = {"float16": np.dtype("<f2"), "float32": np.dtype("<f4")}
+LANDMARK_VALUES = 21 * 3
+
+
+def unpack_landmarks(data, dtype="float32"):
+    """
+    Turns packed bytes (in one of LANDMARK_DTYPES) or nested lists of
+    [x, y, z] into a (N, 21, 3) float32 array. Raises ValueError if the
+    data is not whole hands of finite numbers.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        if dtype not in LANDMARK_DTYPES:
+            raise ValueError(f"dtype must be one of {', '.join(LANDMARK_DTYPES)}")
+        values = np.frombuffer(data, LANDMARK_DTYPES[dtype]) if len(data) % LANDMARK_DTYPES[dtype].itemsize == 0 else None
+    else:
+        try:
+            values = np.asarray(data, dtype=np.float32).ravel()
+        except (TypeError, ValueError):
+            raise ValueError("landmarks must be numbers") from None
+    if values is None or values.size == 0 or values.size % LANDMARK_VALUES:
+        raise ValueError("expected 21 x 3 values per hand")
+    points = values.astype(np.float32).reshape(-1, 21, 3)
+    if not np.isfinite(points).all():
+        raise ValueError("landmarks must be finite numbers")
+    return points
+
+
+def landmarks_to_array(hand_landmarks):
+    """Copies a MediaPipe hand's 21 landmarks into a (21, 3) float32 array."""
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], dtype=np.float32)
+
+
+def hand_moved(points, last, threshold):
+    """True if any landmark moved more than `threshold` in x or y."""
+    return bool(np.abs(points[:, :2] - last[:, :2]).max() >= threshold)
+
+
+def folded_fingers(points):
+    """
+    Returns a (..., 4) bool array: True where index/middle/ring/pinky is folded.
+    A finger is folded when its tip is closer to the wrist than its PIP joint,
+    which holds however the hand is rotated in the image plane.
+    """
+    xy = np.asarray(points, dtype=np.float32)[..., :2]
+    wrist = xy[..., WRIST:WRIST + 1, :]
+    tip_dist = np.square(xy[..., TIPS, :] - wrist).sum(axis=-1)
+    pip_dist = np.square(xy[..., PIPS, :] - wrist).sum(axis=-1)
+    return tip_dist < pip_dist
+
+
+def classify_batch(points):
+    """
+    Classifies a (N, 21, 3) batch of hands in one go.
+    Returns an object array of "snake", "water", "gun" or "detected".
+    """
+    folded = folded_fingers(points)
+    count = folded.sum(axis=-1)
+    # V-sign: index and middle up, ring and pinky folded
+    v_sign = ~folded[..., 0] & ~folded[..., 1] & folded[..., 2] & folded[..., 3]
+    codes = np.select([count == 4, count == 0, v_sign], [GUN, WATER, SNAKE], DETECTED)
+    return GESTURES[codes]
+
+
+def classify(points):
+    """Classifies a single (21, 3) hand. Same labels as classify_batch."""
+    return classify_batch(np.asarray(points)[np.newaxis])[0]
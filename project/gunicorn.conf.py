@@ -0,0 +1,15 @@
+import os
+
+# PRELOAD_VISION=1: load the app, OpenCV and MediaPipe once in the master
+# before forking, so workers share those pages copy-on-write instead of
+# each importing them. Detectors themselves hold threads and must not be
+# forked, so each worker builds its own after the fork.
+preload_app = os.environ.get("PRELOAD_VISION") == "1"
+# Detectors to build per worker right after it starts (0 = on first frame)
+warm_detectors = int(os.environ.get("WARM_DETECTORS", "0"))
+
+
+def post_fork(server, worker):
+    if warm_detectors:
+        from game_logic import preload_vision
+        preload_vision(warm_detectors)
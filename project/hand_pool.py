@@ -0,0 +1,173 @@
+import os
+import threading
+from contextlib import contextmanager
+
+# --- Shared MediaPipe Hands detectors ---
+# Building a Hands graph costs hundreds of milliseconds and tens of MB, so
+# instead of one per Game we keep a small process-wide pool that every session
+# borrows from. A Hands object is not safe to use from two threads at once,
+# so each detector is handed to exactly one caller at a time.
+
+DEFAULT_POOL_SIZE = int(os.environ.get("HANDS_POOL_SIZE", "2"))
+# Streaming sessions keep a tracking (video mode) detector for their whole
+# lifetime, so this also caps the number of concurrent gesture streams.
+DEFAULT_TRACKING_POOL_SIZE = int(os.environ.get("HANDS_TRACKING_POOL_SIZE", "4"))
+
+
+def load_hands_module():
+    """Returns the mediapipe hands solution module, or None if unavailable."""
+    try:
+        import mediapipe as mp
+        # Try different ways to access solutions in case of weird installation
+        if hasattr(mp, 'solutions'):
+            return mp.solutions.hands
+        # Fallback if solutions is missing but module exists
+        try:
+            import mediapipe.python.solutions.hands as mp_hands_module
+            return mp_hands_module
+        except Exception:
+            pass
+        print("Mediapipe module found but 'solutions' attribute is missing. Gesture mode will be limited.")
+    except Exception as e:
+        print(f"Mediapipe Initialization Error: {e}")
+    return None
+
+
+class HandsPool:
+    def __init__(self, size=DEFAULT_POOL_SIZE, **hands_kwargs):
+        self.size = max(1, int(size))
+        # static_image_mode=True for separate frame requests
+        self.hands_kwargs = {
+            "static_image_mode": True,
+            "max_num_hands": 1,
+            "min_detection_confidence": 0.5,
+            "min_tracking_confidence": 0.5,
+        }
+        self.hands_kwargs.update(hands_kwargs)
+        self.available = None  # None until the first detector is built
+        self.created = 0
+        self.in_use = 0
+        self._idle = []
+        self._module = None
+        self._cond = threading.Condition()
+
+    def _create(self):
+        if self._module is None:
+            self._module = load_hands_module()
+        if self._module is None:
+            return None
+        hands = self._module.Hands(**self.hands_kwargs)
+        print("Mediapipe hands initialized successfully via solution mapping.")
+        return hands
+
+    def acquire(self, timeout=None):
+        """
+        Borrows a detector, building one lazily if the pool is not full yet.
+        Returns None if mediapipe is unavailable or nothing freed up in time.
+        """
+        with self._cond:
+            while True:
+                if self.available is False:
+                    return None
+                if self._idle:
+                    self.in_use += 1
+                    return self._idle.pop()
+                if self.created < self.size:
+                    self.created += 1
+                    break
+                if not self._cond.wait(timeout):
+                    return None
+
+        # Build outside the lock so other callers can return detectors meanwhile
+        try:
+            hands = self._create()
+        except Exception as e:
+            print(f"Mediapipe Initialization Error: {e}")
+            hands = None
+
+        with self._cond:
+            if hands is None:
+                self.created -= 1
+                self.available = False
+                self._cond.notify_all()
+                return None
+            self.available = True
+            self.in_use += 1
+            return hands
+
+    def release(self, hands):
+        # Tracking detectors carry state from the previous stream; drop it
+        if not self.hands_kwargs.get("static_image_mode", True) and hasattr(hands, "reset"):
+            try:
+                hands.reset()
+            except Exception:
+                pass
+        with self._cond:
+            self.in_use -= 1
+            self._idle.append(hands)
+            self._cond.notify()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        hands = self.acquire(timeout)
+        try:
+            yield hands
+        finally:
+            if hands is not None:
+                self.release(hands)
+
+    def warm_up(self, count=1):
+        """Builds up to `count` detectors ahead of the first request."""
+        borrowed = []
+        for _ in range(min(count, self.size)):
+            hands = self.acquire(timeout=0)
+            if hands is None:
+                break
+            borrowed.append(hands)
+        for hands in borrowed:
+            self.release(hands)
+        return len(borrowed)
+
+    def close(self):
+        with self._cond:
+            for hands in self._idle:
+                try:
+                    hands.close()
+                except Exception:
+                    pass
+            self.created -= len(self._idle)
+            self._idle = []
+
+
+_pool = None
+_tracking_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HandsPool()
+    return _pool
+
+
+def get_tracking_pool():
+    """Pool of video-mode detectors that reuse landmarks between frames."""
+    global _tracking_pool
+    if _tracking_pool is None:
+        with _pool_lock:
+            if _tracking_pool is None:
+                _tracking_pool = HandsPool(DEFAULT_TRACKING_POOL_SIZE, static_image_mode=False)
+    return _tracking_pool
+
+
+def configure_pool(size=DEFAULT_POOL_SIZE, **hands_kwargs):
+    """Replaces the process-wide pool, e.g. to change its size at startup."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = HandsPool(size, **hands_kwargs)
+    return _pool
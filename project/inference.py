@@ -0,0 +1,422 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+
+import cv2
+import numpy as np
+
+import metrics
+from gestures import classify, hand_moved, landmarks_to_array
+from hand_pool import load_hands_module
+
+# Everything OpenCV/NumPy/MediaPipe related is reached through this module
+# (game_logic.load_vision), so keyboard-only processes never import it.
+
+# --- Hand detection pipeline ---
+# decode -> (crop) -> RGB -> MediaPipe, shared by the inline path (a detector
+# borrowed from hand_pool), streams, and the worker processes below.
+# MediaPipe scales its input down to a couple of hundred pixels anyway, so
+# frames are decoded at reduced size straight from the JPEG (IMREAD_REDUCED_*)
+# and capped at DETECT_MAX_SIDE. Instead of mirroring the image, the returned
+# landmarks are mirrored, which is the same thing for a few dozen floats.
+
+DETECT_MAX_SIDE = int(os.environ.get("DETECT_MAX_SIDE", "320"))
+# Files the offline tools (benchmark, labelling, replay) read as frames
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+# Crops smaller than this share of the frame are not worth a separate pass
+ROI_MAX_AREA = 0.6
+ROI_MARGIN = 0.3
+
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                  (2, cv2.IMREAD_REDUCED_COLOR_2))
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers (C4, C8 and CC are other segments)
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_size(image_bytes):
+    """
+    (width, height) read from a JPEG or PNG header without decoding
+    anything, or None for other formats or a header it cannot follow.
+    """
+    data = memoryview(image_bytes).cast("B")
+    if data[:8] == _PNG_SIGNATURE and len(data) >= 24:
+        return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+    if data[:2] != b"\xff\xd8":
+        return None
+    # Walk the segments up to the frame header; canvas JPEGs reach it in a few hops
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+        elif marker in _JPEG_SOF:
+            return int.from_bytes(data[i + 7:i + 9], "big"), int.from_bytes(data[i + 5:i + 7], "big")
+        elif 0xD0 <= marker <= 0xD9 or marker == 0x01:  # no length field
+            i += 2
+        else:
+            i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+
+class FramePreprocessor:
+    """
+    Decodes frames to at most max_side pixels and converts them to RGB in
+    buffers reused between frames. Not thread-safe: use get_preprocessor().
+    """
+    def __init__(self, max_side=DETECT_MAX_SIDE):
+        self.max_side = max_side
+        self._small = None
+        self._rgb = None
+
+    def _decode_flag(self, image_bytes):
+        # Sized from this frame's own header: threads and workers serve every
+        # session, so the previous frame says nothing about this one
+        size = image_size(image_bytes) if self.max_side else None
+        if size:
+            side = max(size)
+            for factor, flag in _REDUCED_FLAGS:
+                if side // factor >= self.max_side:
+                    return flag
+        return cv2.IMREAD_COLOR
+
+    def decode(self, image_bytes):
+        """Returns the BGR frame scaled to fit max_side, or None."""
+        # frombuffer wraps the request buffer without copying it
+        nparr = np.frombuffer(image_bytes, np.uint8)
+        if nparr.size == 0:
+            return None
+        flag = self._decode_flag(image_bytes)
+        with metrics.stage("decode"):
+            frame = cv2.imdecode(nparr, flag)
+        if frame is None:
+            return None
+
+        side = max(frame.shape[:2])
+        if self.max_side and side > self.max_side:
+            scale = self.max_side / side
+            size = (max(1, round(frame.shape[1] * scale)), max(1, round(frame.shape[0] * scale)))
+            if self._small is None or self._small.shape[1::-1] != size:
+                self._small = np.empty((size[1], size[0], 3), np.uint8)
+            with metrics.stage("resize"):
+                frame = cv2.resize(frame, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        return frame
+
+    def to_rgb(self, frame):
+        if self._rgb is None or self._rgb.shape != frame.shape:
+            self._rgb = np.empty(frame.shape, np.uint8)
+        with metrics.stage("color"):
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+
+    def detect(self, image_bytes, hands, roi=None):
+        """
+        Runs `hands` on an encoded frame. Returns (21, 3) landmarks in mirrored,
+        full-frame normalised coordinates, or None.
+        `roi` is the (x0, y0, x1, y1) box from hand_roi() of the previous hand;
+        the crop is tried first and the full frame only if the hand left it.
+        """
+        frame = self.decode(image_bytes)
+        if frame is None:
+            return None
+        return self.locate(frame, hands, roi)
+
+    def locate(self, frame, hands, roi=None):
+        """detect() on an already decoded frame."""
+        points = None
+        if roi is not None:
+            height, width = frame.shape[:2]
+            # roi is in mirrored coordinates, the frame is not mirrored
+            left, right = int((1 - roi[2]) * width), int(np.ceil((1 - roi[0]) * width))
+            top, bottom = int(roi[1] * height), int(np.ceil(roi[3] * height))
+            if right - left > 1 and bottom - top > 1:
+                crop = frame[top:bottom, left:right]
+                points = find_hand(self.to_rgb(crop), hands)
+                if points is not None:
+                    points[:, 0] = (left + points[:, 0] * crop.shape[1]) / width
+                    points[:, 1] = (top + points[:, 1] * crop.shape[0]) / height
+                    points[:, 2] *= crop.shape[1] / width
+
+        if points is None:
+            points = find_hand(self.to_rgb(frame), hands)
+            if points is None:
+                return None
+        points[:, 0] = 1 - points[:, 0]
+        return points
+
+
+def hand_roi(points, margin=ROI_MARGIN):
+    """
+    Box around a hand's landmarks, padded by `margin` of its size, to crop the
+    next frame to. None when the box would cover most of the frame anyway.
+    """
+    lo = points[:, :2].min(axis=0)
+    hi = points[:, :2].max(axis=0)
+    pad = (hi - lo).max() * margin
+    x0, y0 = np.clip(lo - pad, 0, 1)
+    x1, y1 = np.clip(hi + pad, 0, 1)
+    if (x1 - x0) * (y1 - y0) > ROI_MAX_AREA:
+        return None
+    return (float(x0), float(y0), float(x1), float(y1))
+
+
+def frame_hash(image_bytes):
+    """
+    64-bit difference hash of an encoded frame, or None if it does not decode.
+    Read in grayscale at 1/8 size, so it costs a fraction of a full decode, and
+    sensor noise between two frames of a held pose rarely changes it. It sees
+    the scene rather than the fingers, so different gestures in front of the
+    same background can share a hash; only used with FRAME_CACHE=phash.
+    """
+    with metrics.stage("hash"):
+        gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if gray is None:
+            return None
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        return np.packbits(small[:, 1:] > small[:, :-1]).tobytes()
+
+
+_local = threading.local()
+
+
+def get_preprocessor():
+    """The calling thread's preprocessor (its buffers are not shared)."""
+    preprocessor = getattr(_local, "preprocessor", None)
+    if preprocessor is None:
+        preprocessor = _local.preprocessor = FramePreprocessor()
+    return preprocessor
+
+
+def find_hand(rgb, hands):
+    """Runs a Hands detector on an RGB frame. Returns (21, 3) landmarks or None."""
+    with metrics.stage("inference"):
+        result = hands.process(rgb)
+    if not result.multi_hand_landmarks:
+        return None
+    return landmarks_to_array(result.multi_hand_landmarks[0])
+
+
+def detect_landmarks(image_bytes, hands, roi=None):
+    return get_preprocessor().detect(image_bytes, hands, roi)
+
+
+# --- Cross-session inference queue ---
+# Instead of running MediaPipe on the Flask request thread, frames from every
+# session go into one bounded queue. A dispatcher thread gathers them into
+# small batches (up to batch_size frames or max_wait seconds) and runs each
+# batch on a pool of worker processes, one detector per process. When the
+# queue is full the oldest frame is dropped, and frames that waited longer
+# than max_age are dropped too: a late answer is worse than none for a
+# live gesture. Disabled (workers=0) unless INFERENCE_WORKERS is set.
+
+DEFAULT_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+DEFAULT_QUEUE_DEPTH = int(os.environ.get("INFERENCE_QUEUE_DEPTH", "32"))
+DEFAULT_BATCH_SIZE = int(os.environ.get("INFERENCE_BATCH_SIZE", "8"))
+DEFAULT_MAX_WAIT = float(os.environ.get("INFERENCE_MAX_WAIT_MS", "5")) / 1000
+DEFAULT_MAX_AGE = float(os.environ.get("INFERENCE_MAX_AGE_MS", "500")) / 1000
+
+# What the queue answers for a frame it gave up on (dropped, stale, or lost
+# with a worker), as opposed to None for a frame with no hand in it
+DROPPED = "dropped"
+
+_worker_hands = None
+
+
+def _init_worker(cores, hands_kwargs):
+    global _worker_hands
+    # Pin each worker to its own core so batches do not fight over caches
+    try:
+        os.sched_setaffinity(0, {cores.get(timeout=1)})
+    except Exception:
+        pass
+    module = load_hands_module()
+    _worker_hands = module.Hands(**hands_kwargs) if module else None
+
+
+def _infer_batch(frames):
+    results = []
+    for image_bytes, roi in frames:
+        try:
+            results.append(detect_landmarks(image_bytes, _worker_hands, roi) if _worker_hands else None)
+        except Exception as e:
+            print(f"Gesture Error: {e}")
+            results.append(None)
+    return results
+
+
+class InferenceQueue:
+    def __init__(self, workers, queue_depth=DEFAULT_QUEUE_DEPTH, batch_size=DEFAULT_BATCH_SIZE,
+                 max_wait=DEFAULT_MAX_WAIT, max_age=DEFAULT_MAX_AGE, **hands_kwargs):
+        self.workers = max(1, int(workers))
+        self.queue_depth = max(1, int(queue_depth))
+        self.batch_size = max(1, int(batch_size))
+        self.max_wait = max_wait
+        self.max_age = max_age
+        self.hands_kwargs = {
+            "static_image_mode": True,
+            "max_num_hands": 1,
+            "min_detection_confidence": 0.5,
+        }
+        self.hands_kwargs.update(hands_kwargs)
+        self.dropped = 0
+        self.processed = 0
+        self.restarts = 0
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(self.workers)
+        self._closed = False
+        self._broken = False
+        self._executor = self._start_workers()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="inference-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def _start_workers(self):
+        # spawn: forking a threaded server process is not safe
+        ctx = multiprocessing.get_context("spawn")
+        cores = ctx.Queue()
+        cpu_count = os.cpu_count() or 1
+        for i in range(self.workers):
+            cores.put(i % cpu_count)
+        return ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_init_worker,
+                                   initargs=(cores, self.hands_kwargs))
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    def submit(self, image_bytes, roi=None):
+        """Queues one frame. Returns a Future resolving to landmarks, None or DROPPED."""
+        future = Future()
+        with self._cond:
+            if len(self._pending) >= self.queue_depth:
+                _, _, stale = self._pending.popleft()
+                self.dropped += 1
+                stale.set_result(DROPPED)
+            # Bytes, not a view of the request buffer: it has to cross processes
+            self._pending.append((time.monotonic(), (bytes(image_bytes), roi), future))
+            self._cond.notify()
+        return future
+
+    def infer(self, image_bytes, roi=None, timeout=None):
+        """Blocking submit: waits for the frame's landmarks (DROPPED if it never got any)."""
+        try:
+            return self.submit(image_bytes, roi).result(timeout)
+        except Exception:
+            return DROPPED
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            # Give other sessions a few ms to join the batch
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = []
+            now = time.monotonic()
+            while self._pending and len(batch) < self.batch_size:
+                queued_at, frame, future = self._pending.popleft()
+                if now - queued_at > self.max_age:
+                    self.dropped += 1
+                    future.set_result(DROPPED)
+                    continue
+                batch.append((frame, future))
+            return batch
+
+    def _dispatch(self):
+        while True:
+            # Only hand out a batch when a worker is free; meanwhile frames
+            # keep arriving and the oldest ones fall off the queue
+            self._slots.acquire()
+            batch = self._next_batch()
+            if batch is None:
+                self._slots.release()
+                return
+            if not batch:
+                self._slots.release()
+                continue
+            if self._broken:
+                # A worker died and took the whole pool down with it: start a new one
+                print("Gesture Error: inference worker died, restarting the pool")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._start_workers()
+                self._broken = False
+                self.restarts += 1
+            try:
+                job = self._executor.submit(_infer_batch, [frame for frame, _ in batch])
+            except Exception as e:
+                print(f"Gesture Error: {e}")
+                self._broken = isinstance(e, BrokenProcessPool)
+                self._slots.release()
+                for _, future in batch:
+                    future.set_result(DROPPED)
+                continue
+            job.add_done_callback(lambda job, batch=batch: self._finish(job, batch))
+
+    def _finish(self, job, batch):
+        self._slots.release()
+        try:
+            results = job.result()
+        except Exception as e:
+            print(f"Gesture Error: {e}")
+            # Rebuilt by the dispatcher before the next batch
+            self._broken = self._broken or isinstance(e, BrokenProcessPool)
+            results = [DROPPED] * len(batch)
+        self.processed += len(batch)
+        for (_, future), points in zip(batch, results):
+            future.set_result(points)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            pending, self._pending = self._pending, deque()
+            self._cond.notify_all()
+        for _, _, future in pending:
+            future.set_result(DROPPED)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_queue = None
+_queue_configured = False
+_queue_lock = threading.Lock()
+
+
+def get_inference_queue():
+    """The process-wide inference queue, or None when inference runs inline."""
+    global _queue
+    if _queue is None and not _queue_configured and DEFAULT_WORKERS > 0:
+        with _queue_lock:
+            if _queue is None:
+                _queue = InferenceQueue(DEFAULT_WORKERS)
+    return _queue
+
+
+def queue_stats():
+    """Depth, capacity, workers, drop and restart counts of the running queue, or None if there is none."""
+    queue = _queue
+    if queue is None:
+        return None
+    return {"depth": queue.depth, "capacity": queue.queue_depth, "workers": queue.workers,
+            "dropped": queue.dropped, "processed": queue.processed, "restarts": queue.restarts}
+
+
+def configure_inference(workers=DEFAULT_WORKERS, **options):
+    """Replaces the process-wide queue. workers=0 goes back to inline inference."""
+    global _queue, _queue_configured
+    with _queue_lock:
+        _queue_configured = True
+        if _queue is not None:
+            _queue.close()
+        _queue = InferenceQueue(workers, **options) if workers > 0 else None
+    return _queue
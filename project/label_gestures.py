@@ -0,0 +1,233 @@
+"""
+Offline gesture labelling for a video file or a directory of images.
+
+Runs every frame through the same decode -> MediaPipe -> classify steps as
+Game.process_gesture_frame, on a pool of worker processes, and writes the
+per-frame results in order to a columnar .npz file.
+
+    python label_gestures.py session.mp4 -o session.npz
+    python label_gestures.py recordings/ -o recordings.npz --workers 8
+    python label_gestures.py session.mp4 --stride 2       # every other frame
+
+Columns in the output (one row per frame, load with numpy.load):
+    index      int32     frame number in the video, or position in the directory
+    name       str       image file name (directories only)
+    time_ms    float32   timestamp in the video (videos only)
+    hand       bool      a hand was found
+    gesture    uint8     index into `labels`
+    labels     str       snake, water, gun, detected, none
+    landmarks  float32   (frames, 21, 3), mirrored like the web app; NaN without a hand
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+
+import cv2
+import numpy as np
+
+from gestures import GESTURES, classify_batch
+from hand_pool import load_hands_module
+from inference import DETECT_MAX_SIDE, IMAGE_EXTENSIONS, get_preprocessor
+
+LABELS = np.array(list(GESTURES) + ["none"])
+LABEL_CODES = {name: code for code, name in enumerate(LABELS)}
+NO_HAND = LABEL_CODES["none"]
+DEFAULT_BATCH = 16
+# Batches queued per worker; bounds memory however long the video is
+BATCHES_IN_FLIGHT = 4
+
+
+# --- Workers ---
+# One static-image detector per process: frames are spread over workers, so
+# there is no previous frame to track from.
+
+_hands = None
+
+
+def _init_worker(max_side):
+    global _hands
+    get_preprocessor().max_side = max_side
+    module = load_hands_module()
+    _hands = module.Hands(static_image_mode=True, max_num_hands=1, min_detection_confidence=0.5) if module else None
+
+
+def _label_batch(frames):
+    """Landmarks (or None) for a batch of encoded images (bytes) or decoded BGR frames."""
+    preprocessor = get_preprocessor()
+    results = []
+    for frame in frames:
+        try:
+            if _hands is None:
+                results.append(None)
+            elif isinstance(frame, np.ndarray):
+                results.append(preprocessor.locate(frame, _hands))
+            else:
+                results.append(preprocessor.detect(frame, _hands))
+        except Exception as e:
+            print(f"Gesture Error: {e}")
+            results.append(None)
+    return results
+
+
+# --- Sources ---
+# Each yields (index, name or timestamp, frame). Images are passed on still
+# encoded, so decoding happens in the workers. Video has to be decoded here;
+# frames are shrunk to max_side first so less crosses the process boundary.
+
+def image_frames(directory):
+    names = sorted(name for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS))
+    for index, name in enumerate(names):
+        with open(os.path.join(directory, name), "rb") as f:
+            yield index, name, f.read()
+
+
+def video_frames(path, max_side, stride=1):
+    cap = cv2.VideoCapture(path)
+    index = 0
+    try:
+        while True:
+            if index % stride:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            ok, frame = cap.read()
+            if not ok:
+                break
+            time_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            side = max(frame.shape[:2])
+            if max_side and side > max_side:
+                scale = max_side / side
+                frame = cv2.resize(frame, (max(1, round(frame.shape[1] * scale)), max(1, round(frame.shape[0] * scale))),
+                                   interpolation=cv2.INTER_AREA)
+            yield index, time_ms, frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def batched(frames, size):
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def label(frames, workers, batch_size=DEFAULT_BATCH, max_side=DETECT_MAX_SIDE):
+    """
+    Labels (index, key, frame) tuples on `workers` processes (0 = in this
+    process). Yields (index, key, landmarks or None) in input order.
+    """
+    if workers <= 0:
+        _init_worker(max_side)
+        for batch in batched(frames, batch_size):
+            for (index, key, _), points in zip(batch, _label_batch([frame for _, _, frame in batch])):
+                yield index, key, points
+        return
+
+    # spawn: workers build their own MediaPipe graph instead of inheriting ours
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(max_side,)) as pool:
+        pending = deque()  # (batch keys, AsyncResult), oldest first
+        for batch in batched(frames, batch_size):
+            keys = [(index, key) for index, key, _ in batch]
+            pending.append((keys, pool.apply_async(_label_batch, ([frame for _, _, frame in batch],))))
+            while len(pending) >= workers * BATCHES_IN_FLIGHT:
+                yield from _finish(pending.popleft())
+        while pending:
+            yield from _finish(pending.popleft())
+
+
+def _finish(entry):
+    keys, result = entry
+    for (index, key), points in zip(keys, result.get()):
+        yield index, key, points
+
+
+def to_columns(rows, is_video):
+    """Packs labelled rows into the arrays written to the .npz file."""
+    count = len(rows)
+    landmarks = np.full((count, 21, 3), np.nan, np.float32)
+    hand = np.zeros(count, bool)
+    for i, (_, _, points) in enumerate(rows):
+        if points is not None:
+            landmarks[i] = points
+            hand[i] = True
+
+    gesture = np.full(count, NO_HAND, np.uint8)
+    if hand.any():
+        # Classify every hand in one vectorised pass
+        names = classify_batch(landmarks[hand])
+        gesture[hand] = [LABEL_CODES[name] for name in names]
+
+    columns = {
+        "index": np.array([index for index, _, _ in rows], np.int32),
+        "hand": hand,
+        "gesture": gesture,
+        "labels": LABELS,
+        "landmarks": landmarks,
+    }
+    if is_video:
+        columns["time_ms"] = np.array([key for _, key, _ in rows], np.float32)
+    else:
+        columns["name"] = np.array([key for _, key, _ in rows])
+    return columns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source", help="video file or directory of images")
+    parser.add_argument("-o", "--output", help="output .npz (default: <source>.npz)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes, 0 = inline")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="frames per worker task")
+    parser.add_argument("--max-side", type=int, default=DETECT_MAX_SIDE, help="detection resolution, 0 for full size")
+    parser.add_argument("--stride", type=int, default=1, help="label every Nth video frame")
+    args = parser.parse_args(argv)
+
+    if load_hands_module() is None:
+        print("MediaPipe hands unavailable, nothing to label with.")
+        return 1
+
+    is_video = not os.path.isdir(args.source)
+    if is_video:
+        if not os.path.exists(args.source):
+            print(f"No such file: {args.source}")
+            return 1
+        cap = cv2.VideoCapture(args.source)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        cap.release()
+        frames = video_frames(args.source, args.max_side, max(1, args.stride))
+    else:
+        fps = 0
+        frames = image_frames(args.source)
+
+    start = time.perf_counter()
+    rows = list(label(frames, args.workers, max(1, args.batch), args.max_side))
+    elapsed = time.perf_counter() - start
+    if not rows:
+        print(f"No frames found in {args.source}")
+        return 1
+
+    columns = to_columns(rows, is_video)
+    output = args.output or args.source.rstrip("/\\") + ".npz"
+    np.savez_compressed(output, source=np.array(args.source), fps=np.float32(fps), **columns)
+
+    counts = Counter(LABELS[columns["gesture"]].tolist())
+    print(f"{len(rows)} frames in {elapsed:.2f}s -> {len(rows) / elapsed:.1f} fps on {args.workers} workers")
+    if fps:
+        video_seconds = (rows[-1][0] + 1) / fps
+        print(f"{video_seconds:.1f}s of video, {video_seconds / elapsed:.1f}x real time")
+    print("  " + ", ".join(f"{name}: {counts.get(name, 0)}" for name in LABELS))
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
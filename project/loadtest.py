@@ -0,0 +1,315 @@
+"""
+Load generator for the web app.
+
+Simulates N players, each doing /api/configure and then rounds of
+/api/play plus a few /api/gesture polls with the bundled synthetic frames,
+with think time in between. Reports throughput, per-route latency
+percentiles, error rate and the server's memory growth per session.
+
+    python loadtest.py --players 50 --duration 60          # spawns gunicorn app:app
+    python loadtest.py --url http://127.0.0.1:8000 --pid 1234
+    python loadtest.py --players 200 --json runs/200.json --compare runs/100.json
+
+Without --url a local server is started with the Procfile's settings and
+its RSS (master plus workers) is sampled while the test runs.
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from match_log import DIFFICULTIES
+from rules import CLASSIC
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FRAMES_DIR = os.path.join(HERE, "benchmarks", "frames")
+MOVES = CLASSIC.moves
+RSS_SAMPLE_SECONDS = 0.5
+
+
+# --- Server side ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, threads):
+    """Starts gunicorn app:app like the Procfile does. Returns the process once it answers."""
+    cmd = [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--threads", str(threads), "app:app"]
+    server = subprocess.Popen(cmd, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}: {' '.join(cmd)}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("server did not start within 30s")
+
+
+def process_tree(pid):
+    pids = [pid]
+    for parent in pids:
+        try:
+            for task in os.listdir(f"/proc/{parent}/task"):
+                with open(f"/proc/{parent}/task/{task}/children") as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def rss_mb(pid):
+    """Resident memory of a process and its children in MB (Linux), or None."""
+    if pid is None:
+        return None
+    total = 0
+    for member in process_tree(pid):
+        try:
+            with open(f"/proc/{member}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total / 1024 if total else None
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak = rss_mb(pid) or 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(RSS_SAMPLE_SECONDS):
+            self.peak = max(self.peak, rss_mb(self.pid) or 0)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+# --- Players ---
+
+class Player:
+    def __init__(self, host, port, frames, args, rng):
+        self.host, self.port = host, port
+        self.frames = frames
+        self.args = args
+        self.rng = rng
+        self.cookie = None
+        self.conn = None
+        self.samples = []  # (route, seconds, ok)
+
+    def call(self, route, body, content_type="application/json"):
+        headers = {"Content-Type": content_type}
+        if self.cookie:
+            headers["Cookie"] = self.cookie
+        start = time.perf_counter()
+        ok = False
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.args.timeout)
+            self.conn.request("POST", route, body=body, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            cookie = response.getheader("Set-Cookie")
+            if cookie:
+                self.cookie = cookie.split(";", 1)[0]
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next call, as a browser would
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+        self.samples.append((route, time.perf_counter() - start, ok))
+
+    def think(self):
+        if self.args.think > 0:
+            time.sleep(self.rng.uniform(0, 2 * self.args.think))
+
+    def run(self, deadline, rounds=None):
+        limit = self.args.rounds if rounds is None else rounds
+        config = {"difficulty": self.rng.choice(DIFFICULTIES)}
+        self.call("/api/configure", json.dumps(config))
+        rounds = 0
+        while time.monotonic() < deadline and (not limit or rounds < limit):
+            for _ in range(self.args.gestures_per_round):
+                name, jpeg, encoded = self.rng.choice(self.frames)
+                if self.args.gesture == "frame":
+                    self.call("/api/gesture/frame", jpeg, "image/jpeg")
+                else:
+                    self.call("/api/gesture", encoded)
+                self.think()
+            self.call("/api/play", json.dumps({"move": self.rng.choice(MOVES)}))
+            rounds += 1
+            self.think()
+        if self.conn is not None:
+            self.conn.close()
+
+
+def load_frames():
+    frames = []
+    for name in sorted(os.listdir(FRAMES_DIR)):
+        if name.endswith(".jpg"):
+            with open(os.path.join(FRAMES_DIR, name), "rb") as f:
+                jpeg = f.read()
+            data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode()
+            frames.append((name, jpeg, json.dumps({"image": data_url})))
+    return frames
+
+
+def run(url, args, pid=None):
+    parts = urlsplit(url)
+    frames = load_frames() if args.gestures_per_round else []
+    players = [Player(parts.hostname, parts.port or 80, frames, args, random.Random(args.seed + i))
+               for i in range(args.players)]
+
+    # One round first, so lazy imports (the vision stack on the first frame)
+    # and worker start-up are not counted as per-session growth
+    warmup = Player(parts.hostname, parts.port or 80, frames, args, random.Random(args.seed - 1))
+    warmup.run(time.monotonic() + args.timeout, rounds=1)
+    rss_start = rss_mb(pid)
+    sampler = RssSampler(pid) if pid else None
+    if sampler:
+        sampler.start()
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    threads = []
+    for i, player in enumerate(players):
+        thread = threading.Thread(target=player.run, args=(deadline,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        # Spread connection setup over the ramp-up instead of one burst
+        if args.ramp and i < len(players) - 1:
+            time.sleep(args.ramp / len(players))
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - start
+
+    if sampler:
+        sampler.stop()
+    rss_end = rss_mb(pid)
+    samples = [sample for player in players for sample in player.samples]
+    return summarize(samples, wall, args, rss_start, rss_end, sampler.peak if sampler else None)
+
+
+def summarize(samples, wall, args, rss_start, rss_end, rss_peak):
+    report = {
+        "players": args.players,
+        "think_seconds": args.think,
+        "gesture_mode": args.gesture,
+        "wall_seconds": round(wall, 2),
+        "requests": len(samples),
+        "requests_per_sec": round(len(samples) / wall, 1) if wall else 0,
+        "error_rate": round(sum(not ok for _, _, ok in samples) / len(samples), 4) if samples else 0,
+        "routes": {},
+    }
+    for route in sorted({route for route, _, _ in samples}):
+        mine = [(seconds, ok) for name, seconds, ok in samples if name == route]
+        latency = np.array([seconds for seconds, _ in mine]) * 1000
+        p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+        report["routes"][route] = {
+            "requests": len(mine),
+            "errors": sum(not ok for _, ok in mine),
+            "p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2),
+        }
+    if rss_start is not None and rss_end is not None:
+        report["server_rss_mb"] = {"start": round(rss_start, 1), "end": round(rss_end, 1),
+                                   "peak": round(rss_peak or rss_end, 1)}
+        report["rss_kb_per_session"] = round((rss_end - rss_start) * 1024 / args.players, 1)
+    return report
+
+
+def print_report(report, previous=None):
+    print(f'\n{report["players"]} players, {report["requests"]:,} requests in {report["wall_seconds"]}s '
+          f'-> {report["requests_per_sec"]:,} req/s, {report["error_rate"]:.2%} errors')
+    print("\nRoute                      requests  errors    p50 ms    p95 ms    p99 ms")
+    for route, stats in report["routes"].items():
+        print(f'  {route:<24} {stats["requests"]:>8} {stats["errors"]:>7} '
+              f'{stats["p50_ms"]:>9} {stats["p95_ms"]:>9} {stats["p99_ms"]:>9}')
+    if "server_rss_mb" in report:
+        rss = report["server_rss_mb"]
+        print(f'\nServer RSS: {rss["start"]} -> {rss["end"]} MB (peak {rss["peak"]}), '
+              f'{report["rss_kb_per_session"]} KB per session')
+
+    if previous:
+        print(f'\nAgainst previous run ({previous["players"]} players):')
+        print(f'  throughput   {previous["requests_per_sec"]:>10} -> {report["requests_per_sec"]} req/s')
+        print(f'  error rate   {previous["error_rate"]:>10.2%} -> {report["error_rate"]:.2%}')
+        for route, stats in report["routes"].items():
+            before = previous.get("routes", {}).get(route)
+            if before:
+                print(f'  {route:<24} p95 {before["p95_ms"]} -> {stats["p95_ms"]} ms')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="server to test (default: start gunicorn app:app locally)")
+    parser.add_argument("--pid", type=int, help="server process to sample RSS from when using --url")
+    parser.add_argument("--players", type=int, default=20, help="concurrent players")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--rounds", type=int, default=0, help="stop each player after this many rounds (0 = no limit)")
+    parser.add_argument("--think", type=float, default=0.5, help="mean pause between a player's requests, seconds")
+    parser.add_argument("--ramp", type=float, default=2, help="seconds over which players join")
+    parser.add_argument("--gestures-per-round", type=int, default=3, help="gesture polls before each play")
+    parser.add_argument("--gesture", choices=("json", "frame"), default="json",
+                        help="/api/gesture with base64 JSON or /api/gesture/frame with the raw JPEG")
+    parser.add_argument("--threads", type=int, default=16, help="gunicorn threads for the spawned server")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="save the report to this file")
+    parser.add_argument("--compare", help="a report saved earlier with --json to compare against")
+    args = parser.parse_args(argv)
+
+    server = None
+    pid = args.pid
+    url = args.url
+    if url is None:
+        port = free_port()
+        try:
+            server = start_server(port, args.threads)
+        except Exception as e:
+            print(f"Could not start the server. Error: {e}")
+            return 1
+        url, pid = f"http://127.0.0.1:{port}", server.pid
+
+    try:
+        report = run(url, args, pid)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(report, previous)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["error_rate"] > 0.5 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import atexit
+import hashlib
+import os
+import struct
+import threading
+import time
+import uuid
+
+# --- Match log ---
+# Every round played is appended to a binary file of fixed-width records so
+# finished games can be analysed later (match_stats.py memory-maps it). Off
+# unless MATCH_LOG=path/to/matches.bin. Records are packed into a buffer and
+# written in one append per FLUSH_BYTES or FLUSH_SECONDS, so logging costs
+# a struct.pack per round. Several processes may share one file: each flush
+# is a single O_APPEND write of whole records.
+#
+# File: 16-byte header (magic, version, record size), then records of
+#   session   16 bytes  uuid of the session (hashed if it is not a uuid)
+#   time      float64   unix time of the round
+#   round     uint32    round number within the game
+#   user      uint8     move id (game_logic.MOVE_IDS), 255 if unknown
+#   ai        uint8     move id
+#   winner    uint8     outcome code, index in rules.WINNERS
+#   difficulty uint8    index in DIFFICULTIES, 255 for other levels
+
+MAGIC = b"SWGMLOG\0"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+RECORD = struct.Struct("<16sdIBBBB")
+DIFFICULTIES = ("easy", "medium", "hard")
+UNKNOWN = 255
+
+FLUSH_BYTES = 64 * 1024
+FLUSH_SECONDS = 1.0
+
+_DIFFICULTY_CODES = {level: code for code, level in enumerate(DIFFICULTIES)}
+
+
+def session_key(sid):
+    """16 bytes identifying a session id in the log."""
+    try:
+        return uuid.UUID(str(sid)).bytes
+    except ValueError:
+        return hashlib.blake2b(str(sid).encode(), digest_size=16).digest()
+
+
+class MatchLog:
+    def __init__(self, path, flush_bytes=FLUSH_BYTES, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self.records = 0
+        self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+        self._keys = {}  # sid -> session_key(sid), ids repeat every round
+        self._lock = threading.Lock()
+        self._fd = self._open(path)
+        atexit.register(self.close)
+
+    @staticmethod
+    def _open(path):
+        try:
+            # Only the process that creates the file writes its header
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_EXCL, 0o644)
+            os.write(fd, HEADER.pack(MAGIC, VERSION, RECORD.size))
+            return fd
+        except FileExistsError:
+            return os.open(path, os.O_WRONLY | os.O_APPEND)
+
+    def append(self, sid, round_number, user_id, ai_id, outcome, difficulty):
+        key = self._keys.get(sid)
+        if key is None:
+            if len(self._keys) > 100000:
+                self._keys.clear()
+            key = self._keys[sid] = session_key(sid)
+        record = RECORD.pack(key, time.time(), round_number, user_id, ai_id,
+                             outcome, _DIFFICULTY_CODES.get(difficulty, UNKNOWN))
+        with self._lock:
+            self._buffer += record
+            self.records += 1
+            if len(self._buffer) >= self.flush_bytes or \
+                    time.monotonic() - self._last_flush >= self.flush_seconds:
+                self._flush()
+
+    def _flush(self):
+        if self._buffer and self._fd is not None:
+            try:
+                os.write(self._fd, self._buffer)
+            except OSError as e:
+                print(f"Match log Error: {e}")
+            self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_match_log():
+    """The process-wide log from MATCH_LOG, or None when logging is off."""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                path = os.environ.get("MATCH_LOG")
+                try:
+                    _log = MatchLog(path) if path else False
+                except OSError as e:
+                    print(f"Match log disabled. Error: {e}")
+                    _log = False
+    return _log or None
+
+
+def configure_match_log(path):
+    """Switches logging to `path` (None turns it off). Returns the new log."""
+    global _log
+    with _log_lock:
+        if _log:
+            _log.close()
+        _log = MatchLog(path) if path else False
+    return _log or None
@@ -0,0 +1,136 @@
+"""
+Aggregate statistics over the match log (see match_log.py).
+
+The log is memory-mapped as a NumPy structured array and every statistic is
+computed with vectorised operations, so millions of rounds never become
+Python objects and only the pages actually read are loaded.
+
+    python match_stats.py matches.bin
+    python match_stats.py matches.bin --since 2026-01-01 --json stats.json
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from game_logic import GESTURE_MOVES
+from match_log import DIFFICULTIES, HEADER, MAGIC, RECORD, VERSION
+from rules import COMPUTER_WINS, USER_WINS, WINNERS
+
+# Same layout as match_log.RECORD, field for field
+RECORD_DTYPE = np.dtype([("session", "S16"), ("time", "<f8"), ("round", "<u4"), ("user", "u1"),
+                         ("ai", "u1"), ("winner", "u1"), ("difficulty", "u1")])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+
+def open_log(path):
+    """Memory-maps the log. Returns a read-only structured array (possibly empty)."""
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path}: not a match log (too short)")
+    magic, version, record_size = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path}: unsupported match log (version {version})")
+
+    size = np.memmap(path, dtype=np.uint8, mode="r").size - HEADER.size
+    # A writer may be mid-append: only whole records are mapped
+    count = size // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+
+
+def win_rates(records):
+    """Share of user/computer/tie results per difficulty, and overall."""
+    levels = len(DIFFICULTIES) + 1
+    # Unknown difficulties (255) go in the last bucket
+    difficulty = np.minimum(records["difficulty"], len(DIFFICULTIES)).astype(np.intp)
+    counts = np.bincount(difficulty * 3 + records["winner"], minlength=levels * 3).reshape(levels, 3)
+
+    rates = {}
+    for name, row in zip(DIFFICULTIES + ("other", "all"), list(counts) + [counts.sum(axis=0)]):
+        total = int(row.sum())
+        if total:
+            rates[name] = {"rounds": total, **{winner: round(float(row[i] / total), 4) for i, winner in enumerate(WINNERS)}}
+    return rates
+
+
+def move_distribution(records):
+    """Share of each move played by the user and by the AI."""
+    moves = len(GESTURE_MOVES)
+    result = {}
+    for side in ("user", "ai"):
+        counts = np.bincount(np.minimum(records[side], moves), minlength=moves + 1)[:moves]
+        total = counts.sum()
+        result[side] = {move: round(float(count / total), 4) if total else 0.0 for move, count in zip(GESTURE_MOVES, counts)}
+    return result
+
+
+def streaks(records):
+    """
+    Lengths of consecutive wins within a game, for the user and the
+    computer (ties end a streak). Rounds are put back in time order per
+    session first, since sessions interleave in the log. A session can hold
+    several games (configure and reset start again at round 1), so a game
+    ends wherever the round number does not go up.
+    """
+    if len(records) == 0:
+        return {}
+    # 16-byte session ids as two uint64 columns, so lexsort can key on them
+    session = np.ascontiguousarray(records["session"]).view("<u8").reshape(-1, 2)
+    order = np.lexsort((records["round"], records["time"], session[:, 1], session[:, 0]))
+    session, rounds, winner = session[order], records["round"][order], records["winner"][order]
+
+    # A run starts where the session, the game or the winner changes
+    new_game = (session[1:] != session[:-1]).any(axis=1) | (rounds[1:] <= rounds[:-1])
+    starts = np.flatnonzero(np.r_[True, new_game | (winner[1:] != winner[:-1])])
+    lengths = np.diff(np.r_[starts, len(winner)])
+    run_winner = winner[starts]
+
+    result = {}
+    for name, code in (("user", USER_WINS), ("computer", COMPUTER_WINS)):
+        runs = lengths[run_winner == code]
+        if runs.size:
+            result[name] = {"streaks": int(runs.size), "mean": round(float(runs.mean()), 3),
+                            "longest": int(runs.max()), "p95": float(np.percentile(runs, 95))}
+    return result
+
+
+def summarize(records):
+    return {
+        "rounds": int(len(records)),
+        "sessions": int(np.unique(records["session"]).size) if len(records) else 0,
+        "win_rates": win_rates(records),
+        "moves": move_distribution(records),
+        "streaks": streaks(records),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("log", help="match log written with MATCH_LOG=...")
+    parser.add_argument("--since", help="only rounds from this date/time on (ISO format)")
+    parser.add_argument("--json", help="also write the statistics to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        records = open_log(args.log)
+    except (OSError, ValueError) as e:
+        print(e)
+        return 1
+    if args.since:
+        records = records[records["time"] >= datetime.fromisoformat(args.since).timestamp()]
+
+    stats = summarize(records)
+    print(json.dumps(stats, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(stats, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# --- Metrics ---
+# Latency histograms, counters and gauges rendered in the Prometheus text
+# format by the /metrics route. Off unless METRICS=1: every hook below then
+# returns straight away (stage() hands back one shared no-op timer), so the
+# instrumented code paths pay a function call and nothing else.
+
+ENABLED = os.environ.get("METRICS", "0") == "1"
+
+# Seconds; covers cheap stages (base64, colour convert) up to slow inference
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+HELP = {
+    "gesture_stage_seconds": "Time spent in each step of the gesture pipeline",
+    "http_request_seconds": "Request latency per route",
+    "session_lookup_seconds": "Time to fetch a session's game from the session store",
+    "gesture_frames_total": "Frames received by the gesture endpoints",
+    "gesture_landmarks_total": "Client-side landmark sets received by the gesture endpoints",
+    "gesture_cache_total": "Frame cache lookups by result (hit or miss)",
+}
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOOP = _NoopTimer()
+_histograms = {}  # (name, label name, label value) -> Histogram
+_counters = {}    # (name, label name, label value) -> number
+_gauges = {}      # name -> (help, callback returning a number)
+_lock = threading.Lock()
+
+
+def histogram(name, label=None, value=None):
+    key = (name, label, value)
+    found = _histograms.get(key)
+    if found is None:
+        with _lock:
+            found = _histograms.setdefault(key, Histogram())
+    return found
+
+
+def timer(name, label=None, value=None):
+    """Context manager timing a block into the `name` histogram."""
+    if not ENABLED:
+        return _NOOP
+    return _Timer(histogram(name, label, value))
+
+
+def stage(name):
+    """Context manager timing one step of the gesture pipeline."""
+    return timer("gesture_stage_seconds", "stage", name)
+
+
+def observe(name, seconds, label=None, value=None):
+    if ENABLED:
+        histogram(name, label, value).observe(seconds)
+
+
+def inc(name, amount=1, label=None, value=None):
+    if ENABLED:
+        key = (name, label, value)
+        with _lock:
+            _counters[key] = _counters.get(key, 0) + amount
+
+
+def register_gauge(name, callback, help_text=""):
+    """Adds a value read at scrape time, e.g. the live session count."""
+    _gauges[name] = (help_text, callback)
+
+
+def _labels(label, value, extra=""):
+    parts = []
+    if label:
+        parts.append(f'{label}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        histograms = sorted(_histograms.items(), key=lambda item: tuple(str(part) for part in item[0]))
+        counters = sorted(_counters.items(), key=lambda item: tuple(str(part) for part in item[0]))
+
+    seen = set()
+    for (name, label, value), hist in histograms:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+        with hist._lock:
+            counts, total, count = list(hist.counts), hist.sum, hist.count
+        cumulative = 0
+        for bound, bucket_count in zip(hist.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+            lines.append(f"{name}_bucket{_labels(label, value, le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(label, value)} {total!r}")
+        lines.append(f"{name}_count{_labels(label, value)} {count}")
+
+    for (name, label, value), amount in counters:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_labels(label, value)} {_number(amount)}")
+
+    for name, (help_text, callback) in sorted(_gauges.items()):
+        try:
+            value = callback()
+        except Exception:
+            continue
+        if value is None:
+            continue
+        kind = "counter" if name.endswith("_total") else "gauge"
+        lines.append(f"# HELP {name} {help_text or name}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Gesture polling pacing ---
+# Polling clients are told when to send their next frame and how big it
+# should be, in a "pacing" field on every frame response. The advice is
+# derived from the recent inference latency and how busy the detectors are:
+# an idle server asks for frames every PACING_MIN_MS at full size, a loaded
+# one spaces them out (up to PACING_MAX_MS) and asks for smaller frames so
+# each one is cheaper to decode and upload.
+
+MIN_INTERVAL_MS = int(os.environ.get("PACING_MIN_MS", "500"))
+MAX_INTERVAL_MS = int(os.environ.get("PACING_MAX_MS", "4000"))
+MAX_SIDE = int(os.environ.get("PACING_MAX_SIDE", "320"))
+MIN_SIDE = int(os.environ.get("PACING_MIN_SIDE", "160"))
+# A client should not keep a detector busy for more than this share of its interval
+CLIENT_DUTY = 0.25
+# Weight of the newest sample in the latency average. It starts at 0, so a
+# slow first request (lazy imports) does not throttle clients for long.
+LATENCY_SMOOTHING = 0.2
+
+
+class Pacer:
+    """
+    Tracks frame requests in flight and their latency. `capacity` is how
+    many can run at once (detectors or inference workers), or a callable
+    returning it for the backend in use, and `queue_load` an optional
+    callable returning how full the inference queue is (0..1).
+    """
+    def __init__(self, capacity=1, queue_load=None):
+        self.capacity = capacity
+        self.queue_load = queue_load
+        self.in_flight = 0
+        self.latency = 0.0  # seconds, smoothed
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self):
+        """
+        Wraps the work for one frame request. Only frames: cheap requests
+        (client-side landmarks) would pull the latency average toward zero.
+        """
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.in_flight -= 1
+                self.latency += (elapsed - self.latency) * LATENCY_SMOOTHING
+
+    def load(self):
+        """0 when idle, 1 when every detector is busy, above 1 when requests are waiting."""
+        capacity = self.capacity() if callable(self.capacity) else self.capacity
+        load = self.in_flight / max(1, capacity or 1)
+        if self.queue_load is not None:
+            try:
+                load = max(load, self.queue_load() or 0.0)
+            except Exception:
+                pass
+        return load
+
+    def advice(self):
+        """The "pacing" field for a gesture response: {"next_ms", "max_side", "load"}."""
+        load = self.load()
+        # Enough spacing that one client's frames only use CLIENT_DUTY of a detector,
+        # stretched further as the server fills up
+        interval = self.latency * 1000 / CLIENT_DUTY * (1 + 3 * min(load, 2.0))
+        interval = int(min(MAX_INTERVAL_MS, max(MIN_INTERVAL_MS, interval)))
+        # Full size while there is headroom, down to MIN_SIDE when saturated
+        shrink = min(1.0, max(0.0, load - 0.5) * 2)
+        side = int(MAX_SIDE - (MAX_SIDE - MIN_SIDE) * shrink) // 16 * 16
+        return {"next_ms": interval, "max_side": max(MIN_SIDE, side), "load": round(load, 2)}
@@ -15,8 +15,10 @@
 # Snake beats Water
 # Water beats Gun
 # Gun beats Snake
+import argparse
 import random
-import time
+
+from rules import CLASSIC, TIE, USER_WINS
 
 # Optional: ensure UTF-8 for Windows console
 import sys
@@ -28,6 +30,7 @@ try:
     import cv2
     import mediapipe as mp
     mp.solutions # Verify solutions is available
+    from camera_pipeline import CameraPipeline
     gesture_libs = True
 except Exception as e:
     print(f"Warning: Could not import gesture libraries. Error: {e}")
@@ -35,6 +38,13 @@ except Exception as e:
     mp = None
     gesture_libs = False
 
+parser = argparse.ArgumentParser(description="Snake–Water–Gun in the terminal")
+parser.add_argument("--source", default="0",
+                    help="camera index, video file, or directory/glob of images for gesture mode")
+parser.add_argument("--headless", action="store_true", help="no preview window (e.g. with a video source)")
+parser.add_argument("--fps", type=float, help="replay rate for video/image sources, 0 = as fast as possible")
+args = parser.parse_args()
+
 
 try:
     sys.stdout.reconfigure(encoding='utf-8')
@@ -48,6 +58,8 @@ tie = 0
 rounds = 1
 
 user_history = []
+# Running count of each move so the hard AI never rescans user_history
+user_move_counts = {move: 0 for move in CLASSIC.moves}
 user_streak = 0
 computer_streak = 0
 
@@ -93,91 +105,56 @@ def configure_game_settings():
 def get_keyboard_input():
     while True:
         choice = input("Enter snake / water / gun: ").lower().strip()
-        if choice in ["snake", "water", "gun"]:
+        if choice in CLASSIC.moves:
             return choice
         print("Invalid choice. Please type 'snake', 'water', or 'gun'.")
 
 # ------------------ OPENCV HAND GESTURE INPUT ------------------
-if gesture_libs:
-    mp_hands_module = mp.solutions.hands
-    mp_draw = mp.solutions.drawing_utils
-    mp_hands = mp_hands_module.Hands(max_num_hands=1)
-else:
-    mp_hands = None
-    mp_draw = None
+# The camera, MediaPipe and the preview window run as a pipeline on their own
+# threads (camera_pipeline.py), started on the first gesture round and kept
+# open until the game ends, or reopened if the camera stops delivering frames.
+camera = None
+# Seconds of live preview before a gesture counts, so the last round's hand is not reused
+READY_SECONDS = 1.0
 
 def detect_gesture():
+    global camera
     if not gesture_libs:
         print("Gesture libraries not available — falling back to keyboard mode.")
         return None
 
-    cap = cv2.VideoCapture(0)
-    gesture = None
+    if camera is None:
+        try:
+            camera = CameraPipeline(args.source, headless=args.headless, fps=args.fps).start()
+        except Exception as e:
+            print(f"Camera error: {e}")
+            return None
 
     print("\nShow Gesture:")
     print("✊ Fist → Gun")
     print("✋ Palm → Water")
     print("✌️ Two fingers → Snake")
-    time.sleep(2)
-
-    fail_count = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            fail_count += 1
-            if fail_count > 10:
-                print("Camera error: Could not read frames.")
-                break
-            continue
-        fail_count = 0
-
-
-        frame = cv2.flip(frame, 1)
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        result = mp_hands.process(rgb)
-
-        if result.multi_hand_landmarks:
-            for hand_landmarks in result.multi_hand_landmarks:
-                mp_draw.draw_landmarks(frame, hand_landmarks, mp_hands_module.HAND_CONNECTIONS)
-
-                tips = [8, 12, 16, 20]   # finger tips
-                folded = 0
-
-                for tip in tips:
-                    if hand_landmarks.landmark[tip].y > hand_landmarks.landmark[tip - 2].y:
-                        folded += 1
-
-                # Gesture detection rules
-                if folded == 4:
-                    gesture = "gun"     # fist
-                elif folded == 0:
-                    gesture = "water"   # open palm
-                elif folded == 2:
-                    gesture = "snake"   # two fingers
-
-                if gesture:
-                    cv2.putText(frame, f"Detected: {gesture.upper()}", (20, 80),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-
-        cv2.putText(frame, "Show Gesture", (20, 40),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-
-        cv2.imshow("Gesture Mode", frame)
-
-        if gesture:
-            time.sleep(1)
-            break
-
-        if cv2.waitKey(1) & 0xFF == 27:  # ESC
-            break
 
-    cap.release()
-    cv2.destroyAllWindows()
+    gesture = camera.next_gesture(ready=0 if args.headless else READY_SECONDS)
+    if args.headless:
+        stats = camera.stats()
+        print(f"📷 {stats['capture_fps']} fps camera, {stats['inference_fps']} fps model, "
+              f"{stats['latency_ms']} ms latency, {stats['dropped']} frames dropped")
+    if gesture is None and camera.exhausted:
+        # A failed read (or the end of a video) ends the pipeline for good
+        print("Camera stopped delivering frames; it will be reopened next round.")
+        close_camera()
     return gesture
 
+def close_camera():
+    global camera
+    if camera is not None:
+        camera.stop()
+        camera = None
+
 # ------------------ AI HELPERS ------------------
 def computer_ai_choice():
-    choices = ["snake", "water", "gun"]
+    choices = CLASSIC.moves
 
     if difficulty == "easy":
         return random.choice(choices)
@@ -189,8 +166,8 @@ def computer_ai_choice():
         return random.choice(choices)
 
     if user_history:
-        predicted = max(set(user_history), key=user_history.count)
-        return {"snake": "gun", "water": "snake", "gun": "water"}[predicted]
+        predicted = max(user_move_counts, key=user_move_counts.get)
+        return choices[CLASSIC.counter[CLASSIC.ids[predicted]]]
 
     return random.choice(choices)
 
@@ -236,17 +213,17 @@ def game():
         return
 
     user_history.append(user_choice)
+    user_move_counts[user_choice] += 1
 
     print(f"🖥️ Computer chose: {computer_choice}")
 
-    if user_choice == computer_choice:
+    outcome = CLASSIC.winner(CLASSIC.ids[user_choice], CLASSIC.ids[computer_choice])
+    if outcome == TIE:
         print("It's a tie 🤝")
         tie += 1
         user_streak = computer_streak = 0
 
-    elif (user_choice == "snake" and computer_choice == "water") or \
-         (user_choice == "water" and computer_choice == "gun") or \
-         (user_choice == "gun" and computer_choice == "snake"):
+    elif outcome == USER_WINS:
         print("You won 🤩🥳")
         user_score += 1
         user_streak += 1
@@ -286,6 +263,7 @@ while True:
     print("\n🏁 FINAL RESULT")
     print(f"You: {user_score} | Computer: {computer_score} | Tie: {tie}")
     
+    close_camera()
     restart_game = input("Start a completely new game (change mode)? (yes/no): ").lower()
     if restart_game != "yes":
         print("Game Over 👋")
@@ -0,0 +1,89 @@
+# --- Game rules ---
+# Moves are small ints (their index in Rules.moves) and who beats whom is
+# plain data: a Rules object turns a {move: moves it beats} mapping into flat
+# lookup tables once, so deciding a round is one index instead of a chain of
+# string comparisons. Shared by the web game (game_logic.py, strategies.py),
+# the CLI (python file.py) and bulk tools through the vectorised resolve().
+#
+# A variant is just another mapping, e.g. five moves where each beats two:
+#   Rules.from_dict({"moves": ["rock", "paper", "scissors", "lizard", "spock"],
+#                    "beats": {"rock": ["scissors", "lizard"], ...}})
+
+# Outcome codes, from the user's side; WINNERS[code] is the name used in results
+USER_WINS, COMPUTER_WINS, TIE = 0, 1, 2
+WINNERS = ("user", "computer", "tie")
+
+
+class Rules:
+    __slots__ = ("moves", "ids", "size", "beats", "outcome", "counter", "_table")
+
+    def __init__(self, moves, beats):
+        self.moves = tuple(moves)
+        self.ids = {move: i for i, move in enumerate(self.moves)}
+        self.size = len(self.moves)
+        if self.size < 2 or len(self.ids) != self.size:
+            raise ValueError("rules need at least two distinct moves")
+        unknown = {move for pair in beats.items() for move in (pair[0], *pair[1])} - set(self.ids)
+        if unknown:
+            raise ValueError(f"unknown moves in beats: {', '.join(sorted(unknown))}")
+        self.beats = {move: frozenset(beats.get(move, ())) for move in self.moves}
+
+        # outcome[user * size + ai]; every pair of different moves must be decided one way
+        outcome = bytearray(self.size * self.size)
+        for user in self.moves:
+            for ai in self.moves:
+                wins, loses = ai in self.beats[user], user in self.beats[ai]
+                if user == ai:
+                    code = TIE
+                elif wins == loses:
+                    raise ValueError(f"{user} vs {ai} must be won by exactly one of them")
+                else:
+                    code = USER_WINS if wins else COMPUTER_WINS
+                outcome[self.ids[user] * self.size + self.ids[ai]] = code
+        self.outcome = bytes(outcome)
+        # counter[m]: the first move (in order) that beats m, so strategies always have an answer
+        unbeaten = [move for move in self.moves if not any(move in self.beats[other] for other in self.moves)]
+        if unbeaten:
+            raise ValueError(f"every move must be beaten by another: {', '.join(unbeaten)}")
+        self.counter = tuple(next(i for i, other in enumerate(self.moves) if move in self.beats[other])
+                             for move in self.moves)
+        self._table = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rules from {"moves": [...], "beats": {move: [moves it beats]}}, e.g. loaded from JSON."""
+        return cls(data["moves"], data["beats"])
+
+    def to_dict(self):
+        return {"moves": list(self.moves),
+                "beats": {move: sorted(self.beats[move], key=self.ids.get) for move in self.moves}}
+
+    def winner(self, user, ai):
+        """Outcome code for move ids `user` and `ai`. An unknown user move loses."""
+        if user >= self.size:
+            return COMPUTER_WINS
+        return self.outcome[user * self.size + ai]
+
+    def resolve(self, user_moves, ai_moves):
+        """
+        Outcome codes for whole arrays of move ids at once (NumPy, any shape
+        that broadcasts). Unknown user moves lose, as in winner().
+        """
+        import numpy as np
+        if self._table is None:
+            # One extra row for unknown user moves
+            table = np.full((self.size + 1, self.size), COMPUTER_WINS, np.uint8)
+            table[:self.size] = np.frombuffer(self.outcome, np.uint8).reshape(self.size, self.size)
+            self._table = table
+        user = np.minimum(np.asarray(user_moves, np.intp), self.size)
+        return self._table[user, np.asarray(ai_moves, np.intp)]
+
+    def encode(self, moves):
+        """Move names to a list of ids; unknown names become len(moves)."""
+        return [self.ids.get(move, self.size) for move in moves]
+
+
+CLASSIC = Rules(("snake", "water", "gun"),
+                {"snake": ("water",), "water": ("gun",), "gun": ("snake",)})
+
+VARIANTS = {"classic": CLASSIC}
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from game_logic import Game
+
+# --- Session stores ---
+# Maps a session id to its Game. MemoryStore keeps live Game objects in this
+# process with LRU + TTL eviction. SQLiteStore keeps Game.dump() blobs in a
+# local database file so every gunicorn worker on the box sees the same
+# sessions. Pick one with SESSION_STORE=memory (default) or
+# SESSION_STORE=sqlite:///sessions.db.
+#
+# Gesture routes only change the debounce state, and they may overlap a
+# /api/play on a copy loaded before it, so they call save_gesture(), which
+# never writes back scores or history.
+
+DEFAULT_MAX_SESSIONS = int(os.environ.get("SESSION_MAX", "10000"))
+DEFAULT_TTL = float(os.environ.get("SESSION_TTL", str(6 * 3600)))
+
+
+class MemoryStore:
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, ttl=DEFAULT_TTL):
+        self.max_sessions = max(1, int(max_sessions))
+        self.ttl = ttl
+        self._games = OrderedDict()  # sid -> (last_used, Game), oldest first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._games)
+
+    def get(self, sid):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._games.get(sid)
+            if entry is None:
+                return None
+            if now - entry[0] > self.ttl:
+                del self._games[sid]
+                return None
+            self._games[sid] = (now, entry[1])
+            self._games.move_to_end(sid)
+            return entry[1]
+
+    def save(self, sid, game):
+        now = time.monotonic()
+        with self._lock:
+            self._games[sid] = (now, game)
+            self._games.move_to_end(sid)
+            while len(self._games) > self.max_sessions:
+                self._games.popitem(last=False)
+            # Expired sessions sit at the front, so this stops at the first live one
+            while self._games:
+                oldest_sid, (last_used, _) = next(iter(self._games.items()))
+                if now - last_used <= self.ttl:
+                    break
+                del self._games[oldest_sid]
+
+    def save_gesture(self, sid, game):
+        # Live objects are shared, so there is nothing to write; just don't
+        # bring back a game that was replaced or evicted meanwhile
+        with self._lock:
+            entry = self._games.get(sid)
+            if entry is not None and entry[1] is game:
+                self._games[sid] = (time.monotonic(), game)
+                self._games.move_to_end(sid)
+
+    def delete(self, sid):
+        with self._lock:
+            self._games.pop(sid, None)
+
+
+class SQLiteStore:
+    # Expired rows are purged on roughly one save in this many
+    PURGE_EVERY = 500
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._saves = 0
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS sessions "
+                       "(sid TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL, gesture TEXT)")
+            db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+            # Databases created before the gesture column
+            columns = {row[1] for row in db.execute("PRAGMA table_info(sessions)")}
+            if "gesture" not in columns:
+                db.execute("ALTER TABLE sessions ADD COLUMN gesture TEXT")
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def __len__(self):
+        # Expired rows linger until the next purge; they are not live sessions
+        return self._connect().execute("SELECT COUNT(*) FROM sessions WHERE updated >= ?",
+                                       (time.time() - self.ttl,)).fetchone()[0]
+
+    def get(self, sid):
+        row = self._connect().execute(
+            "SELECT state, gesture FROM sessions WHERE sid = ? AND updated >= ?",
+            (sid, time.time() - self.ttl)).fetchone()
+        if row is None:
+            return None
+        game = Game.load(row[0])
+        if game is not None and row[1] is not None:
+            game.load_gesture(row[1])
+        return game
+
+    def save(self, sid, game):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO sessions (sid, state, updated, gesture) VALUES (?, ?, ?, ?)",
+                       (sid, game.dump(), now, game.dump_gesture()))
+            self._saves += 1
+            if self._saves % self.PURGE_EVERY == 0:
+                db.execute("DELETE FROM sessions WHERE updated < ?", (now - self.ttl,))
+
+    def save_gesture(self, sid, game):
+        # Only the gesture column: a round saved meanwhile keeps its scores
+        with self._connect() as db:
+            db.execute("UPDATE sessions SET gesture = ?, updated = ? WHERE sid = ?",
+                       (game.dump_gesture(), time.time(), sid))
+
+    def delete(self, sid):
+        with self._connect() as db:
+            db.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+
+def create_store(url=None):
+    """Builds the store named by `url` or the SESSION_STORE environment variable."""
+    url = url or os.environ.get("SESSION_STORE", "memory")
+    # sqlite:///sessions.db is relative, sqlite:////var/run/sessions.db absolute
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    if url == "memory":
+        return MemoryStore()
+    raise ValueError(f"Unknown session store: {url}")
@@ -0,0 +1,251 @@
+"""
+Headless simulator and benchmark for the game core.
+
+Plays scripted player models against every difficulty level across all CPU
+cores and reports rounds/sec, per-call latency percentiles and win rates.
+
+    python simulate.py --rounds 1000000
+    python simulate.py --save-baseline      # record benchmarks/baseline.json
+    python simulate.py --check              # exit 1 on a throughput regression
+
+Baselines are only comparable on the machine they were recorded on.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from game_logic import GESTURE_MOVES, Game
+from strategies import STRATEGIES
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "baseline.json")
+# Latency samples kept per job and call; enough for stable p99s
+MAX_SAMPLES = 20000
+# Rounds per job, so a long run spreads evenly over the workers
+CHUNK_ROUNDS = 50000
+
+
+# --- Player models ---
+# Each is called as model(game, rng) and returns the player's next move.
+
+def random_player(game, rng):
+    return rng.choice(GESTURE_MOVES)
+
+
+def constant_player(game, rng):
+    return "snake"
+
+
+def cycle_player(game, rng):
+    return GESTURE_MOVES[game.rounds % 3]
+
+
+def biased_player(game, rng):
+    return "water" if rng.random() < 0.5 else rng.choice(GESTURE_MOVES)
+
+
+def win_stay_lose_shift_player(game, rng):
+    # Repeats a winning move, otherwise moves on to the next one
+    if game.last_move is None:
+        return rng.choice(GESTURE_MOVES)
+    if game.user_streak > 0:
+        return game.last_move
+    return GESTURE_MOVES[(GESTURE_MOVES.index(game.last_move) + 1) % 3]
+
+
+PLAYERS = {
+    "random": random_player,
+    "constant": constant_player,
+    "cycle": cycle_player,
+    "biased": biased_player,
+    "win-stay-lose-shift": win_stay_lose_shift_player,
+}
+
+
+def run_job(job):
+    """Plays one chunk of rounds. Returns counts, timings and latency samples."""
+    player_name, difficulty, rounds, seed = job
+    random.seed(seed)
+    rng = random.Random(seed + 1)
+    player = PLAYERS[player_name]
+    game = Game()
+    game.difficulty = difficulty
+    winners = {"user": 0, "computer": 0, "tie": 0}
+    clock = time.perf_counter_ns
+    sample_every = max(1, rounds // MAX_SAMPLES)
+    samples = {"play_round": [], "get_ai_choice": [], "get_coach_advice": [], "get_commentary": []}
+
+    start = clock()
+    for i in range(rounds):
+        move = player(game, rng)
+        t0 = clock()
+        result = game.play_round(move)
+        t1 = clock()
+        winners[result["winner"]] += 1
+        if i % sample_every == 0:
+            samples["play_round"].append(t1 - t0)
+    elapsed = clock() - start
+
+    # The helpers run inside play_round, so time them on their own. They take
+    # well under a microsecond, so each sample is the mean of a small batch
+    # to keep the timer's own cost out of the numbers.
+    batch = 32
+    for name, call, arg in (("get_ai_choice", game.get_ai_choice, None),
+                            ("get_coach_advice", game.get_coach_advice, "snake"),
+                            ("get_commentary", game.get_commentary, "user")):
+        args = () if arg is None else (arg,)
+        for _ in range(min(rounds, MAX_SAMPLES) // batch):
+            t0 = clock()
+            for _ in range(batch):
+                call(*args)
+            samples[name].append((clock() - t0) // batch)
+
+    return {
+        "player": player_name,
+        "difficulty": difficulty,
+        "rounds": rounds,
+        "elapsed_ns": elapsed,
+        "winners": winners,
+        "samples": {name: np.array(values, dtype=np.int64) for name, values in samples.items()},
+    }
+
+
+def make_jobs(rounds, players, difficulties, seed):
+    jobs = []
+    for player in players:
+        for difficulty in difficulties:
+            remaining = rounds
+            while remaining > 0:
+                chunk = min(CHUNK_ROUNDS, remaining)
+                jobs.append((player, difficulty, chunk, seed + len(jobs)))
+                remaining -= chunk
+    return jobs
+
+
+def summarize(results, wall_seconds):
+    total_rounds = sum(r["rounds"] for r in results)
+    report = {
+        "rounds": total_rounds,
+        "wall_seconds": round(wall_seconds, 3),
+        "rounds_per_sec": round(total_rounds / wall_seconds) if wall_seconds else 0,
+        "difficulties": {},
+        "latency_ns": {},
+        "win_rates": {},
+    }
+
+    for difficulty in sorted({r["difficulty"] for r in results}):
+        mine = [r for r in results if r["difficulty"] == difficulty]
+        busy = sum(r["elapsed_ns"] for r in mine) / 1e9
+        # Single-core throughput, comparable across machines with different core counts
+        report["difficulties"][difficulty] = {
+            "rounds_per_sec_per_core": round(sum(r["rounds"] for r in mine) / busy) if busy else 0
+        }
+
+    for name in results[0]["samples"]:
+        values = np.concatenate([r["samples"][name] for r in results])
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        report["latency_ns"][name] = {"p50": int(p50), "p95": int(p95), "p99": int(p99), "max": int(values.max())}
+
+    for r in results:
+        key = f'{r["player"]} vs {r["difficulty"]}'
+        totals = report["win_rates"].setdefault(key, {"user": 0, "computer": 0, "tie": 0})
+        for winner, count in r["winners"].items():
+            totals[winner] += count
+    for key, totals in report["win_rates"].items():
+        played = sum(totals.values())
+        report["win_rates"][key] = {winner: round(count / played, 4) for winner, count in totals.items()}
+    return report
+
+
+def print_report(report):
+    print(f'\n{report["rounds"]:,} rounds in {report["wall_seconds"]}s -> {report["rounds_per_sec"]:,} rounds/sec')
+    print("\nThroughput per core:")
+    for difficulty, stats in report["difficulties"].items():
+        print(f'  {difficulty:<8} {stats["rounds_per_sec_per_core"]:>12,} rounds/sec')
+    print("\nLatency (ns):        p50       p95       p99       max")
+    for name, stats in report["latency_ns"].items():
+        print(f'  {name:<16} {stats["p50"]:>8} {stats["p95"]:>9} {stats["p99"]:>9} {stats["max"]:>9}')
+    print("\nWin rates (user / computer / tie):")
+    for key, rates in report["win_rates"].items():
+        print(f'  {key:<32} {rates["user"]:.3f} / {rates["computer"]:.3f} / {rates["tie"]:.3f}')
+
+
+def check_baseline(report, baseline, tolerance):
+    """Returns the list of regressions against a saved report."""
+    problems = []
+    for difficulty, stats in baseline.get("difficulties", {}).items():
+        current = report["difficulties"].get(difficulty)
+        if current is None:
+            continue
+        floor = stats["rounds_per_sec_per_core"] * (1 - tolerance)
+        if current["rounds_per_sec_per_core"] < floor:
+            problems.append(f'{difficulty}: {current["rounds_per_sec_per_core"]:,} rounds/sec per core, '
+                            f'baseline {stats["rounds_per_sec_per_core"]:,}')
+    # The helpers take well under a microsecond and are too noisy to gate on
+    stats = baseline.get("latency_ns", {}).get("play_round")
+    current = report["latency_ns"].get("play_round")
+    if stats and current and current["p50"] > stats["p50"] * (1 + tolerance):
+        problems.append(f'play_round: p50 {current["p50"]}ns, baseline {stats["p50"]}ns')
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200000, help="rounds per player model and difficulty")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--players", default=",".join(PLAYERS), help="comma-separated player models")
+    parser.add_argument("--difficulties", default=",".join(STRATEGIES), help="comma-separated difficulty levels")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--check", action="store_true", help="exit 1 if slower than the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown for --check")
+    args = parser.parse_args(argv)
+
+    players = [p for p in args.players.split(",") if p]
+    unknown = [p for p in players if p not in PLAYERS]
+    if unknown:
+        parser.error(f"unknown player models: {', '.join(unknown)}")
+    difficulties = [d for d in args.difficulties.split(",") if d]
+
+    jobs = make_jobs(args.rounds, players, difficulties, args.seed)
+    start = time.perf_counter()
+    if args.workers > 1:
+        with Pool(args.workers) as pool:
+            results = pool.map(run_job, jobs)
+    else:
+        results = [run_job(job) for job in jobs]
+    report = summarize(results, time.perf_counter() - start)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first.")
+            return 1
+        with open(args.baseline) as f:
+            problems = check_baseline(report, json.load(f), args.tolerance)
+        if problems:
+            print("\nRegressions against baseline:")
+            for problem in problems:
+                print(f"  {problem}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,25 @@ let currentMode = '1';
 let currentDifficulty = 'easy';
 let currentAvatar = 'rusty';
 let webcamStream = null;
-let gestureInterval = null;
+let gestureSocket = null;
+let streamTimer = null;
+let streamPaused = false;
+const STREAM_FPS = 20;
+// Longest side of uploaded frames; the server detects at about this size
+// anyway. Set to 0 to send frames at the camera's native resolution.
+const FRAME_MAX_SIDE = 320;
+
+function drawFrame(canvas, video, maxSide = FRAME_MAX_SIDE) {
+    const scale = maxSide ? Math.min(1, maxSide / Math.max(video.videoWidth, video.videoHeight)) : 1;
+    const width = Math.round(video.videoWidth * scale);
+    const height = Math.round(video.videoHeight * scale);
+    // Resizing reallocates the backing store, so only do it when the size changes
+    if (canvas.width !== width || canvas.height !== height) {
+        canvas.width = width;
+        canvas.height = height;
+    }
+    canvas.getContext('2d').drawImage(video, 0, 0, width, height);
+}
 
 function selectMode(mode, btn) {
     currentMode = mode;
@@ -173,7 +191,9 @@ async function startCamera() {
     try {
         webcamStream = await navigator.mediaDevices.getUserMedia({ video: true });
         video.srcObject = webcamStream;
-        gestureInterval = setInterval(processGesture, 1000);
+        if (!startGestureStream()) {
+            startPolling();
+        }
     } catch (err) {
         console.error("Camera error: ", err);
         document.getElementById('gesture-detected').innerText = "Camera access denied.";
@@ -185,80 +205,204 @@ function stopCamera() {
         webcamStream.getTracks().forEach(track => track.stop());
         webcamStream = null;
     }
-    if (gestureInterval) clearInterval(gestureInterval);
+    stopPolling();
+    stopGestureStream();
+}
+
+// --- Streaming gesture channel ---
+// Frames go over one WebSocket at STREAM_FPS and the server only answers when
+// the stable gesture changes. Falls back to polling if the socket fails.
+function startGestureStream() {
+    if (!('WebSocket' in window)) return false;
+
+    const proto = location.protocol === 'https:' ? 'wss://' : 'ws://';
+    const socket = new WebSocket(proto + location.host + '/ws/gesture');
+    socket.binaryType = 'arraybuffer';
+    let opened = false;
+
+    socket.onopen = () => {
+        opened = true;
+        streamPaused = false;
+        streamTimer = setInterval(sendStreamFrame, 1000 / STREAM_FPS);
+    };
+    socket.onmessage = (msg) => handleStreamEvent(JSON.parse(msg.data));
+    socket.onclose = () => {
+        if (streamTimer) clearInterval(streamTimer);
+        streamTimer = null;
+        if (gestureSocket !== socket) return;
+        gestureSocket = null;
+        // Server has no streaming support or ran out of detectors: poll instead
+        if (webcamStream) startPolling();
+    };
+
+    gestureSocket = socket;
+    return true;
+}
+
+function stopGestureStream() {
+    if (streamTimer) clearInterval(streamTimer);
+    streamTimer = null;
+    if (gestureSocket) {
+        const socket = gestureSocket;
+        gestureSocket = null;
+        socket.close();
+    }
+}
+
+const streamCanvas = document.createElement('canvas');
+
+function sendStreamFrame() {
+    const video = document.getElementById('webcam');
+    if (streamPaused || !gestureSocket || gestureSocket.readyState !== WebSocket.OPEN) return;
+    // Skip frames while the previous ones are still being uploaded
+    if (gestureSocket.bufferedAmount > 0 || !video || !video.videoWidth) return;
+
+    drawFrame(streamCanvas, video);
+    streamCanvas.toBlob(blob => {
+        if (blob && gestureSocket && gestureSocket.readyState === WebSocket.OPEN) {
+            gestureSocket.send(blob);
+        }
+    }, 'image/jpeg', 0.4);
 }
 
-let stableGesture = null;
-let gestureCount = 0;
+async function handleStreamEvent(data) {
+    const statusEl = document.getElementById('gesture-detected');
+    if (data.error) {
+        console.error("Gesture stream error:", data.error);
+        return;
+    }
+    if (streamPaused) return;
+
+    const gesture = data.gesture;
+    if (!gesture) {
+        statusEl.innerText = "Scanning...";
+        statusEl.style.color = '';
+        return;
+    }
+    if (gesture === 'detected') {
+        statusEl.innerText = "Hand Detected. Form a gesture!";
+        statusEl.style.color = 'var(--accent)';
+        return;
+    }
+
+    // The server already debounced this gesture, so play it straight away
+    statusEl.innerText = `LOCKED: ${gesture.toUpperCase()}!`;
+    statusEl.style.color = 'var(--secondary)';
+    streamPaused = true;
+
+    await playMove(gesture);
+
+    setTimeout(() => {
+        statusEl.innerText = "Scanning...";
+        statusEl.style.color = '';
+        if (gestureSocket && gestureSocket.readyState === WebSocket.OPEN) {
+            gestureSocket.send('reset');
+        }
+        streamPaused = false;
+    }, 2500);
+}
+
+// --- Polling gesture channel ---
+// One frame in flight at a time: the next one is only scheduled once the
+// previous response is back, after the interval the server advertised in
+// its `pacing` field (longer, with smaller frames, when it is busy). Failed
+// requests back off exponentially instead.
+const POLL_DEFAULT_MS = 1000;
+const POLL_MAX_MS = 8000;
+let pollTimer = null;
+let pollActive = false;
+let pollInFlight = false;
+let pollDelay = POLL_DEFAULT_MS;
+let pollMaxSide = FRAME_MAX_SIDE;
+const pollCanvas = document.createElement('canvas');
+
+function startPolling() {
+    pollActive = true;
+    // A request still in flight schedules the next one itself
+    if (!pollInFlight && !pollTimer) pollTimer = setTimeout(processGesture, pollDelay);
+}
+
+function stopPolling() {
+    pollActive = false;
+    if (pollTimer) clearTimeout(pollTimer);
+    pollTimer = null;
+}
+
+function applyPacing(pacing) {
+    if (pacing) {
+        pollDelay = Math.min(POLL_MAX_MS, Math.max(0, pacing.next_ms));
+        pollMaxSide = pacing.max_side || FRAME_MAX_SIDE;
+    } else {
+        pollDelay = Math.min(POLL_MAX_MS, pollDelay * 2);
+    }
+}
 
 async function processGesture() {
+    pollTimer = null;
+    pollInFlight = true;
+    try {
+        await sendGestureFrame();
+    } finally {
+        pollInFlight = false;
+        if (pollActive && !pollTimer) pollTimer = setTimeout(processGesture, pollDelay);
+    }
+}
+
+async function sendGestureFrame() {
     const video = document.getElementById('webcam');
     if (!video || !video.videoWidth) return;
 
-    const canvas = document.createElement('canvas');
-    canvas.width = video.videoWidth;
-    canvas.height = video.videoHeight;
-    const ctx = canvas.getContext('2d');
-    ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
+    drawFrame(pollCanvas, video, pollMaxSide);
 
-    const imageData = canvas.toDataURL('image/jpeg', 0.4);
+    // Send the JPEG bytes as-is instead of a base64 data URL (~33% smaller)
+    const blob = await new Promise(resolve => pollCanvas.toBlob(resolve, 'image/jpeg', 0.4));
+    if (!blob) return;
 
     try {
-        const response = await fetch('/api/gesture', {
+        const response = await fetch('/api/gesture/frame', {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ image: imageData })
+            headers: { 'Content-Type': 'image/jpeg' },
+            body: blob
         });
 
         const data = await response.json();
+        // Busy answers (503) carry pacing too; other failures just back off
+        applyPacing(data.pacing);
+        if (!response.ok) return;
         const gesture = data.gesture;
 
         const statusEl = document.getElementById('gesture-detected');
 
-        if (gesture) {
-            if (gesture === 'detected') {
-                statusEl.innerText = "Hand Detected. Form a gesture!";
-                statusEl.style.color = 'var(--accent)';
-                stableGesture = null;
-                gestureCount = 0;
-                return;
-            }
-
-            if (gesture === stableGesture) {
-                gestureCount++;
-            } else {
-                stableGesture = gesture;
-                gestureCount = 1;
-            }
-
-            if (gestureCount >= 2) {
-                statusEl.innerText = `LOCKED: ${gesture.toUpperCase()}!`;
-                statusEl.style.color = 'var(--secondary)';
-
-                clearInterval(gestureInterval);
-                stableGesture = null;
-                gestureCount = 0;
-
-                await playMove(gesture);
-
-                setTimeout(() => {
-                    statusEl.innerText = "Scanning...";
-                    statusEl.style.color = '';
-                    if (currentMode === '2' && !document.getElementById('game-screen').classList.contains('hidden')) {
-                        gestureInterval = setInterval(processGesture, 800);
-                    }
-                }, 2500);
-            } else {
-                statusEl.innerText = `Detecting... ${gesture.toUpperCase()}`;
-                statusEl.style.color = 'var(--warning)';
-            }
+        // The server debounces frames and sets `committed` once per held gesture
+        if (data.committed) {
+            statusEl.innerText = `LOCKED: ${data.committed.toUpperCase()}!`;
+            statusEl.style.color = 'var(--secondary)';
+
+            stopPolling();
+
+            await playMove(data.committed);
+
+            setTimeout(() => {
+                statusEl.innerText = "Scanning...";
+                statusEl.style.color = '';
+                if (webcamStream && currentMode === '2' && !document.getElementById('game-screen').classList.contains('hidden')) {
+                    startPolling();
+                }
+            }, 2500);
+        } else if (gesture === 'dropped') {
+            // The server was too busy for this frame; keep showing the last answer
+        } else if (gesture === 'detected') {
+            statusEl.innerText = "Hand Detected. Form a gesture!";
+            statusEl.style.color = 'var(--accent)';
+        } else if (gesture) {
+            statusEl.innerText = `Detecting... ${gesture.toUpperCase()}`;
+            statusEl.style.color = 'var(--warning)';
         } else {
-            stableGesture = null;
-            gestureCount = 0;
             statusEl.innerText = "Scanning...";
             statusEl.style.color = '';
         }
     } catch (err) {
+        applyPacing(null);
         console.error("Gesture processing error:", err);
     }
 }
@@ -0,0 +1,140 @@
+import os
+import random
+
+from rules import CLASSIC
+
+# --- Opponent strategies ---
+# Each difficulty level is a registered strategy that picks the computer's
+# move for a Game. Strategies are shared, stateless objects: whatever they
+# learn about a player lives on the Game (move_counts, ngram), so it is
+# serialised with the session and costs nothing for players who never use it.
+# Moves are the rules' ids (rules.CLASSIC: 0..2 for snake, water, gun).
+
+MOVE_COUNT = CLASSIC.size
+UNKNOWN_MOVE_ID = 255
+# COUNTER[m] beats m: gun beats snake, snake beats water, water beats gun
+COUNTER = CLASSIC.counter
+
+NGRAM_ORDER = int(os.environ.get("AI_NGRAM_ORDER", "3"))
+NGRAM_MAX_CONTEXTS = int(os.environ.get("AI_NGRAM_MAX_CONTEXTS", "256"))
+# A context needs this many observations before it is trusted over a shorter one
+NGRAM_MIN_SUPPORT = 2
+
+
+def context_key(moves):
+    """Packs a run of move ids into one int; the leading 1 keeps lengths apart."""
+    key = 1
+    for move in moves:
+        if move >= MOVE_COUNT:
+            return None
+        key = key * MOVE_COUNT + move
+    return key
+
+
+class NGramModel:
+    """
+    Order-k Markov model of a player's moves: for every context of the last
+    1..order moves, how often each move followed it. An update touches at
+    most `order` contexts. Once the table holds more than max_contexts,
+    the rarest half is pruned, so memory stays bounded however long the
+    game runs (for order <= 4 every possible context fits anyway).
+    """
+    __slots__ = ("order", "max_contexts", "table")
+
+    def __init__(self, order=NGRAM_ORDER, max_contexts=NGRAM_MAX_CONTEXTS, table=None):
+        self.order = max(1, int(order))
+        self.max_contexts = max(MOVE_COUNT, int(max_contexts))
+        self.table = table if table is not None else {}  # context key -> [count per move]
+
+    def observe(self, history):
+        """Records history[-1] as following each of its preceding contexts."""
+        move = history[-1]
+        if move >= MOVE_COUNT:
+            return
+        table = self.table
+        for length in range(1, min(self.order, len(history) - 1) + 1):
+            key = context_key(history[-length - 1:-1])
+            if key is None:
+                # Longer contexts contain the same unknown move
+                break
+            counts = table.get(key)
+            if counts is None:
+                counts = table[key] = [0, 0, 0]
+            counts[move] += 1
+        if len(table) > self.max_contexts:
+            self.prune()
+
+    def prune(self):
+        ranked = sorted(self.table.items(), key=lambda item: sum(item[1]), reverse=True)
+        self.table = dict(ranked[:self.max_contexts // 2])
+
+    def predict(self, history):
+        """Most likely next move id from the longest trusted context, or None."""
+        for length in range(min(self.order, len(history)), 0, -1):
+            key = context_key(history[-length:])
+            if key is None:
+                continue
+            counts = self.table.get(key)
+            if counts is not None and sum(counts) >= NGRAM_MIN_SUPPORT:
+                return max(range(MOVE_COUNT), key=counts.__getitem__)
+        return None
+
+
+class Strategy:
+    """Plays a random move with probability `noise`, otherwise predict()."""
+    def __init__(self, noise=1.0):
+        self.noise = noise
+
+    def observe(self, game):
+        """Called after the player's move was appended to game.history."""
+
+    def predict(self, game):
+        """Move id the player is expected to play next, or None."""
+        return None
+
+    def choose(self, game):
+        """Returns the computer's move id."""
+        if self.noise < 1.0 and random.random() >= self.noise:
+            predicted = self.predict(game)
+            if predicted is not None:
+                return COUNTER[predicted]
+        return random.randrange(MOVE_COUNT)
+
+
+class FrequencyStrategy(Strategy):
+    """Counters the player's most frequent (decayed) move."""
+    def predict(self, game):
+        counts = game.move_counts
+        if max(counts) > 0:
+            return max(range(MOVE_COUNT), key=counts.__getitem__)
+        return None
+
+
+class MarkovStrategy(FrequencyStrategy):
+    """Counters the n-gram prediction, falling back to overall frequency."""
+    def observe(self, game):
+        game.ngram.observe(game.history)
+
+    def predict(self, game):
+        predicted = game.ngram.predict(game.history)
+        if predicted is None:
+            predicted = super().predict(game)
+        return predicted
+
+
+STRATEGIES = {}
+
+
+def register_strategy(name, strategy):
+    STRATEGIES[name] = strategy
+    return strategy
+
+
+def get_strategy(name):
+    """Strategy for a difficulty level; unknown levels play randomly."""
+    return STRATEGIES.get(name) or STRATEGIES["easy"]
+
+
+register_strategy("easy", Strategy(noise=1.0))
+register_strategy("medium", FrequencyStrategy(noise=0.6))
+register_strategy("hard", MarkovStrategy(noise=0.3))